@@ -3,11 +3,37 @@ import argparse, json, math
 from pathlib import Path
 import pandas as pd
 import yaml
+try:
+    import xlsxwriter  # optional: streams sheets several times faster than openpyxl
+    XLSX_ENGINE = "xlsxwriter"
+except ImportError:
+    XLSX_ENGINE = "openpyxl"
+
+EXCEL_MAX_ROWS = 1_048_576  # per sheet, header included
 
 def load_json(p): 
     p=Path(p); 
     return json.loads(p.read_text(encoding="utf-8")) if p.exists() else {}
 
+def question_flags(rec, dfraw, n_pages, th, near):
+    """Per-page conflict/missing/near counts over Q1..Q5, from one groupby over all boxes.
+    rec gives each dfraw row's position in ocr_results; questions without boxes count as missing."""
+    full = pd.MultiIndex.from_product([range(n_pages), range(1,6)], names=["rec","q"])
+    per_q = pd.DataFrame({"checked": 0, "near": False}, index=full)
+    if not dfraw.empty:
+        d = pd.DataFrame({
+            "rec": rec,
+            "q": dfraw["id"].str.extract(r"^Q([1-5])_", expand=False),
+            "checked": dfraw.get("checked", pd.Series(False, index=dfraw.index)).fillna(False).astype(bool),
+            "near": (dfraw.get("score", pd.Series(0.0, index=dfraw.index)).fillna(0)-th).abs() <= near,
+        }).dropna(subset=["q"]).astype({"q": int})
+        per_q = d.groupby(["rec","q"]).agg(checked=("checked","sum"), near=("near","any")).reindex(full, fill_value=0)
+    return pd.DataFrame({
+        "conflict": per_q["checked"] > 1,
+        "missing":  per_q["checked"] == 0,
+        "near":     per_q["near"].astype(bool),
+    }).groupby(level="rec").sum()
+
 def main():
     ap = argparse.ArgumentParser()
     ap.add_argument("--run-dir", required=True)
@@ -30,23 +56,19 @@ def main():
     if th is None:
         th = 0.55
 
-    rows = []
     raw_rows = []
-    for page_rec in ocr:
-        page = page_rec.get("page")
+    rec = []
+    for i, page_rec in enumerate(ocr):
         boxes = page_rec.get("checkboxes", [])
-        for b in boxes:
-            raw_rows.append({"page": page, **b})
-        # per-question conflict/missing/near
-        flags = {"conflict":0,"missing":0,"near":0}
-        for qi in range(1,6):
-            prefix = f"Q{qi}_"
-            q = [b for b in boxes if b["id"].startswith(prefix)]
-            checked = [b for b in q if b.get("checked")]
-            if len(checked)>1: flags["conflict"] += 1
-            if len(checked)==0: flags["missing"]  += 1
-            near_any = any(abs(b.get("score",0)-th)<=args.near for b in q)
-            flags["near"] += int(near_any)
+        raw_rows.extend({"page": page_rec.get("page"), **b} for b in boxes)
+        rec.extend([i]*len(boxes))
+    dfraw = pd.DataFrame(raw_rows)
+    # per-question conflict/missing/near for every page at once
+    page_flags = question_flags(rec, dfraw, len(ocr), th, args.near).to_dict("records")
+
+    rows = []
+    for page_rec, flags in zip(ocr, page_flags):
+        page = page_rec.get("page")
         res = None
         qual = None
         if "pages" in hom and page in hom["pages"]:
@@ -68,18 +90,28 @@ def main():
             })
 
     dfq = pd.DataFrame(rows, columns=["page","quality","residual_px","flags_conflict","flags_missing","flags_near_threshold","issues","recommended_action"])
-    dfraw = pd.DataFrame(raw_rows)
 
     outdir = run/"review"
     outdir.mkdir(parents=True, exist_ok=True)
     dfq.to_csv(outdir/"review_queue.csv", index=False)
-    with pd.ExcelWriter(outdir/"review_queue.xlsx", engine="openpyxl") as xl:
+    # raw rows that cannot fit on one sheet go to a side file instead
+    raw_side = None
+    if len(dfraw) >= EXCEL_MAX_ROWS:
+        try:
+            raw_side = outdir/"checkbox_raw.parquet"
+            dfraw.to_parquet(raw_side, index=False)
+        except ImportError:
+            raw_side = outdir/"checkbox_raw.csv"
+            dfraw.to_csv(raw_side, index=False)
+    with pd.ExcelWriter(outdir/"review_queue.xlsx", engine=XLSX_ENGINE) as xl:
         dfq.to_excel(xl, index=False, sheet_name="Queue")
-        if not dfraw.empty:
+        if not dfraw.empty and raw_side is None:
             dfraw.to_excel(xl, index=False, sheet_name="CheckboxRaw")
 
     print("Wrote:", outdir/"review_queue.csv")
     print("Wrote:", outdir/"review_queue.xlsx")
+    if raw_side is not None:
+        print("Wrote:", raw_side, f"({len(dfraw)} raw rows exceed one Excel sheet)")
 
 if __name__ == "__main__":
     main()
@@ -1,6 +1,13 @@
 #!/usr/bin/env python3
-import argparse, json, cv2, numpy as np
+import argparse, json, os
+os.environ.setdefault("OMP_NUM_THREADS", "1")  # before cv2/numpy load their thread pools
+import cv2, numpy as np
+cv2.setNumThreads(1)  # threaded OpenCV mostly adds lock contention on these small images
+cv2.ocl.setUseOpenCL(False)
 from pathlib import Path
+from warp_cache import roi_rect, warp_cached
+
+VIS_FORMATS = {"png": [], "jpg": [cv2.IMWRITE_JPEG_QUALITY, 85], "webp": [cv2.IMWRITE_WEBP_QUALITY, 80]}
 
 def load_json(p): return json.loads(Path(p).read_text(encoding="utf-8"))
 
@@ -10,70 +17,64 @@ def apply_h(M, pts):
     out = out[:,:2] / out[:,2:3]
     return out
 
-def crop_from_template(warped, roi, tpl_w, tpl_h, margin=2):
-    x = int(roi["x"]*tpl_w)+margin
-    y = int(roi["y"]*tpl_h)+margin
-    w = int(roi["w"]*tpl_w)-2*margin
-    h = int(roi["h"]*tpl_h)-2*margin
-    x=max(0,x); y=max(0,y); w=max(1,w); h=max(1,h)
-    return warped[y:y+h, x:x+w]
-
 def main():
     ap = argparse.ArgumentParser()
     ap.add_argument("--run-dir", required=True)
     ap.add_argument("--template", required=True)
     ap.add_argument("--limit", type=int, default=0, help="limit number of pages")
+    ap.add_argument("--vis-format", choices=sorted(VIS_FORMATS), default="jpg", help="montage image format")
+    ap.add_argument("--no-cache", action="store_true", help="do not read or write run/cache/warped")
     args = ap.parse_args()
 
     run = Path(args.run_dir)
     tpl = json.loads(Path(args.template).read_text(encoding="utf-8"))
     tpl_w = tpl["page_size"]["width_px"]; tpl_h = tpl["page_size"]["height_px"]
     rois = tpl["checkbox_rois_norm"]
-    M_by_page = load_json(run/"logs/homography.json")["pages"]
+    hom_path = run/"logs/homography.json"
+    M_by_page = load_json(hom_path)["pages"]
 
     # prefer existing aligned pages; else compute on the fly
     aligned_dir = run/"02_step2_alignment_and_crop"/"aligned_full"
     src_dir = run/"images"
+    warped_cache = None if args.no_cache else run/"cache"/"warped"  # shared with threshold_sweep.py
     out_dir = run/"review"/"montage"
     out_dir.mkdir(parents=True, exist_ok=True)
 
     pages = sorted(M_by_page.keys())
     if args.limit>0: pages = pages[:args.limit]
 
+    # ROI rectangles and montage layout depend only on the template, so build them once
+    # 5x5 montage: rows = Q1..Q5, cols = options 0..4
+    rects = np.array([roi_rect(roi, tpl_w, tpl_h, margin=2) for roi in rois[:25]], dtype=np.int64)
+    cell_h = max(int(0.08*tpl_h), 120)
+    cell_w = max(int(0.07*tpl_w), 120)
+    gap = 6
+    rc = np.arange(25)
+    cell_yx = np.stack([gap + (rc//5)*(cell_h+gap), gap + (rc%5)*(cell_w+gap)], axis=1)
+    canvas = np.empty((5*cell_h + 6*gap, 5*cell_w + 6*gap), np.uint8)
+
     for page_name in pages:
         H = np.array(M_by_page[page_name]["M"], dtype=np.float32)
         # load source
-        cand = [aligned_dir/f"{Path(page_name).stem}_aligned_full.png", src_dir/page_name]
-        img = None
-        for c in cand:
-            if c.exists():
-                img = cv2.imread(str(c), cv2.IMREAD_GRAYSCALE)
-                if "aligned_full" not in str(c):
-                    img = cv2.warpPerspective(img, H, (tpl_w, tpl_h))
-                break
+        aligned = aligned_dir/f"{Path(page_name).stem}_aligned_full.png"
+        if aligned.exists():
+            img = cv2.imread(str(aligned), cv2.IMREAD_GRAYSCALE)
+        else:
+            img = warp_cached(src_dir/page_name, H, tpl_w, tpl_h, warped_cache, deps=(hom_path,))
         if img is None:
             continue
 
-        # build 5x5 montage: rows = Q1..Q5, cols = options 0..4
-        cell_h = max(int(0.08*tpl_h), 120)
-        cell_w = max(int(0.07*tpl_w), 120)
-        gap = 6
-        canvas = np.full((5*cell_h + 6*gap, 5*cell_w + 6*gap), 255, np.uint8)
-
-        for r in range(5):
-            for c in range(5):
-                rid = r*5+c
-                crop = crop_from_template(img, rois[rid], tpl_w, tpl_h, margin=2)
-                crop = cv2.resize(crop, (cell_w, cell_h), interpolation=cv2.INTER_AREA)
-                y0 = gap + r*(cell_h+gap)
-                x0 = gap + c*(cell_w+gap)
-                canvas[y0:y0+cell_h, x0:x0+cell_w] = crop
-                # border
-                cv2.rectangle(canvas, (x0, y0), (x0+cell_w-1, y0+cell_h-1), 0, 2)
+        canvas.fill(255)
+        for (x, y, w, h), (y0, x0) in zip(rects.tolist(), cell_yx.tolist()):
+            # resize straight into the canvas cell
+            cv2.resize(img[y:y+h, x:x+w], (cell_w, cell_h), dst=canvas[y0:y0+cell_h, x0:x0+cell_w],
+                       interpolation=cv2.INTER_AREA)
+            # border
+            cv2.rectangle(canvas, (x0, y0), (x0+cell_w-1, y0+cell_h-1), 0, 2)
 
         # save
-        out = out_dir/f"{Path(page_name).stem}_montage.png"
-        cv2.imwrite(str(out), canvas)
+        out = out_dir/f"{Path(page_name).stem}_montage.{args.vis_format}"
+        cv2.imwrite(str(out), canvas, VIS_FORMATS[args.vis_format])
         print("Wrote", out)
 
 if __name__ == "__main__":
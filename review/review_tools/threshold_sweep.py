@@ -1,52 +1,71 @@
 #!/usr/bin/env python3
-import argparse, json, cv2, numpy as np
+import argparse, json, os
+os.environ.setdefault("OMP_NUM_THREADS", "1")  # before cv2/numpy load their thread pools
+import cv2, numpy as np
+cv2.setNumThreads(1)  # threaded OpenCV mostly adds lock contention on these small images
+cv2.ocl.setUseOpenCL(False)
 from pathlib import Path
+import yaml
+from warp_cache import roi_rect, cached_warp, warp_patch
 
 def load_json(p): return json.loads(Path(p).read_text(encoding="utf-8"))
 
-def crop(warped, roi, tpl_w, tpl_h, margin=2):
-    x = int(roi["x"]*tpl_w)+margin
-    y = int(roi["y"]*tpl_h)+margin
-    w = int(roi["w"]*tpl_w)-2*margin
-    h = int(roi["h"]*tpl_h)-2*margin
-    x=max(0,x); y=max(0,y); w=max(1,w); h=max(1,h)
-    return warped[y:y+h, x:x+w]
-
 def main():
     ap = argparse.ArgumentParser()
     ap.add_argument("--run-dir", required=True)
     ap.add_argument("--template", required=True)
     ap.add_argument("--limit", type=int, default=50)
+    ap.add_argument("--threshold", type=float, default=None)
+    ap.add_argument("--near", type=float, default=0.03)
+    ap.add_argument("--no-cache", action="store_true", help="do not read run/cache/warped")
     args = ap.parse_args()
 
     run = Path(args.run_dir)
+
+    # threshold (same lookup as build_review_queue.py)
+    th = args.threshold
+    cfg_p = Path("configs/ocr.yaml")
+    if th is None and cfg_p.exists():
+        cfg = yaml.safe_load(cfg_p.read_text(encoding="utf-8"))
+        th = float((cfg.get("checkbox") or {}).get("fill_threshold", 0.55))
+    if th is None:
+        th = 0.55
+
     tpl = json.loads(Path(args.template).read_text(encoding="utf-8"))
     tpl_w = tpl["page_size"]["width_px"]; tpl_h = tpl["page_size"]["height_px"]
     rois = tpl["checkbox_rois_norm"]
+    # (x, y, w, h) per ROI in template pixels; page independent, so computed once
+    rects = np.array([roi_rect(roi, tpl_w, tpl_h, 2) for roi in rois], dtype=np.int32).tolist()
     pages = load_json(run/"logs/ocr_results.json")
-    Hpages = load_json(run/"logs/homography.json")["pages"]
+    hom_path = run/"logs/homography.json"
+    Hpages = load_json(hom_path)["pages"]
 
     out_dir = run/"review"/"threshold_sweeps"
     out_dir.mkdir(parents=True, exist_ok=True)
     src_dir = run/"images"
+    warped_cache = None if args.no_cache else run/"cache"/"warped"  # shared with montage_from_run.py
 
     count = 0
     for rec in pages:
         if count >= args.limit: break
         page = rec["page"]
-        near = [b for b in rec["checkboxes"] if abs(b.get("score",0)-0.55)<=0.03]  # default; adjust if needed
+        # filter on the scores alone; pages with nothing near the threshold never touch disk
+        near = [b for b in rec["checkboxes"] if abs(b.get("score",0)-th)<=args.near]
         if not near: continue
         H = np.array(Hpages[page]["M"], dtype=np.float32)
-        img = cv2.imread(str(src_dir/page), cv2.IMREAD_GRAYSCALE)
-        if img is None: continue
-        warped = cv2.warpPerspective(img, H, (tpl_w, tpl_h))
+        # a page montage_from_run.py already warped is reused; otherwise only the few
+        # near-threshold patches are warped, far cheaper than warping the full page
+        warped = cached_warp(src_dir/page, tpl_w, tpl_h, warped_cache, deps=(hom_path,))
+        if warped is None:
+            img = cv2.imread(str(src_dir/page), cv2.IMREAD_GRAYSCALE)
+            if img is None: continue
 
         for b in near[:3]:  # up to 3 per page
             # roi find
             q, idx = b["id"].split("_")
             rid = (int(q[1:])-1)*5 + int(idx)
-            roi = rois[rid]
-            patch = crop(warped, roi, tpl_w, tpl_h, 2)
+            x, y, w, h = rects[rid]
+            patch = warped[y:y+h, x:x+w] if warped is not None else warp_patch(img, H, x, y, w, h)
             # build panel
             thresholds = [0.35,0.40,0.45,0.50,0.55,0.60,0.65,0.70,0.75]
             h,w = patch.shape
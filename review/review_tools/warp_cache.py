@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+"""Template-space helpers shared by montage_from_run.py and threshold_sweep.py.
+
+run/cache/warped/<stem>.png holds each source page warped to template size. A cached
+page is used only while it is newer than its source and deps (e.g. homography.json)
+and still has the template shape.
+"""
+import cv2, numpy as np
+
+def roi_rect(roi, tpl_w, tpl_h, margin=2):
+    x = int(roi["x"]*tpl_w)+margin
+    y = int(roi["y"]*tpl_h)+margin
+    w = int(roi["w"]*tpl_w)-2*margin
+    h = int(roi["h"]*tpl_h)-2*margin
+    x=max(0,x); y=max(0,y); w=max(1,w); h=max(1,h)
+    return x, y, min(w, tpl_w-x), min(h, tpl_h-y)
+
+def cached_warp(src, tpl_w, tpl_h, cache_dir, deps=()):
+    """Warped page from cache_dir/<stem>.png while it is fresh; None when there is no
+    usable copy. cache_dir=None disables the cache."""
+    cached = cache_dir/f"{src.stem}.png" if cache_dir else None
+    if not (cached and src.exists() and cached.exists()): return None
+    if cached.stat().st_mtime < max(p.stat().st_mtime for p in (src, *deps)): return None
+    img = cv2.imread(str(cached), cv2.IMREAD_GRAYSCALE)
+    return img if img is not None and img.shape == (tpl_h, tpl_w) else None
+
+def warp_cached(src, H, tpl_w, tpl_h, cache_dir, deps=()):
+    """Like cached_warp, but on a miss warp src with H and store the result in cache_dir."""
+    img = cached_warp(src, tpl_w, tpl_h, cache_dir, deps)
+    if img is not None: return img
+    img = cv2.imread(str(src), cv2.IMREAD_GRAYSCALE) if src.exists() else None
+    if img is None: return None
+    warped = cv2.warpPerspective(img, H, (tpl_w, tpl_h))
+    if cache_dir:
+        cache_dir.mkdir(parents=True, exist_ok=True)
+        cv2.imwrite(str(cache_dir/f"{src.stem}.png"), warped)
+    return warped
+
+def warp_patch(img, H, x, y, w, h):
+    """Warp only the template rectangle (x, y, w, h).
+
+    Near-identical to cropping a full-page warp, not bit-exact: with perspective terms in H the
+    composed sampling coordinates round differently, so a few thresholded pixels can flip.
+    """
+    T = np.array([[1,0,-x],[0,1,-y],[0,0,1]], np.float64)
+    return cv2.warpPerspective(img, T @ H, (w, h))
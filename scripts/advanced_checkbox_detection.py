@@ -11,14 +11,14 @@ import sys
 def method_1_otsu(checkbox):
     """Current method: Otsu thresholding"""
     _, binary = cv2.threshold(checkbox, 0, 255, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)
-    fill_pct = (np.sum(binary == 255) / binary.size) * 100
+    fill_pct = cv2.countNonZero(binary) * 100.0 / binary.size
     return fill_pct, binary
 
 def method_2_adaptive(checkbox):
     """Adaptive thresholding - better for varying lighting"""
     binary = cv2.adaptiveThreshold(checkbox, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C,
                                    cv2.THRESH_BINARY_INV, 11, 2)
-    fill_pct = (np.sum(binary == 255) / binary.size) * 100
+    fill_pct = cv2.countNonZero(binary) * 100.0 / binary.size
     return fill_pct, binary
 
 def method_3_mean_based(checkbox):
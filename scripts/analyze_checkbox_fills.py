@@ -5,15 +5,35 @@ Analyze checkbox fill percentages across all pages to find checked boxes
 import cv2
 import numpy as np
 import json
+import sys
 from pathlib import Path
 from collections import defaultdict
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))  # repo root, so scripts.common imports without PYTHONPATH
+from scripts.common import imread_gray, otsu_threshold, rois_as_records
 
-def analyze_checkbox(img_gray, x, y, w, h):
-    """Extract and analyze a single checkbox"""
-    checkbox = img_gray[y:y+h, x:x+w]
-    _, binary = cv2.threshold(checkbox, 0, 255, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)
-    fill_pct = (np.sum(binary == 255) / binary.size) * 100
-    return fill_pct, checkbox
+def roi_fill_percentages(img_gray, xs, ys, ws, hs):
+    """Fill percentage of every ROI from one page-wide Otsu binarization.
+
+    The page is thresholded once and reduced to a summed-area table, so each
+    ROI costs four table lookups instead of its own threshold pass.
+    """
+    # 0/1 "dark" mask via a 256-entry LUT (same split as THRESH_BINARY_INV),
+    # so the table sums are pixel counts directly
+    lut = (np.arange(256) <= otsu_threshold(img_gray)).astype(np.uint8)
+    sat = cv2.integral(cv2.LUT(img_gray, lut))
+    x1, y1 = xs + ws, ys + hs
+    counts = sat[y1, x1] - sat[ys, x1] - sat[y1, xs] + sat[ys, xs]
+    return counts / (ws * hs) * 100.0
+
+def rois_to_px(rois, w, h):
+    """Pixel (x, y, w, h) for each ROI_DTYPE (scripts.common) row, plus a mask of those inside the page"""
+    xs = (rois['x'] * w).astype(int)
+    ys = (rois['y'] * h).astype(int)
+    ws = (rois['w'] * w).astype(int)
+    hs = (rois['h'] * h).astype(int)
+    rois_px = np.stack([xs, ys, ws, hs], axis=1)
+    inside = (xs >= 0) & (ys >= 0) & (xs + ws <= w) & (ys + hs <= h)
+    return rois_px[inside], inside
 
 def main():
     run_dir = Path("artifacts/run_20251001_185300")
@@ -28,53 +48,59 @@ def main():
     
     print(f"Analyzing {len(image_files)} pages for checkbox fill percentages...\n")
     
-    # Track statistics
-    all_fills = []
+    sample_files = image_files[:5]  # Sample first 5 pages
+    
+    # Track statistics (fills written in place into a buffer sized for the sample)
+    all_fills = np.empty(len(sample_files) * len(template['checkbox_rois_norm']), dtype=np.float32)
+    n_fills = 0
     page_stats = []
     highest_fills = []  # Track top filled checkboxes
     
-    for img_path in image_files[:5]:  # Sample first 5 pages
+    # ROI pixel geometry only depends on page size, which aligned pages share
+    rois = rois_as_records(template)
+    rois_px_by_size = {}
+    over_buf = np.empty(len(rois), dtype=bool)  # scratch mask reused for every count
+    
+    for img_path in sample_files:
         page_num = img_path.stem.split('_')[1]
         
-        img = cv2.imread(str(img_path))
-        img_gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+        img_gray = imread_gray(img_path)
         h, w = img_gray.shape
         
-        page_fills = []
+        if (h, w) not in rois_px_by_size:
+            # Skip ROIs that fall outside the page
+            rois_px, inside = rois_to_px(rois, w, h)
+            ids = rois['id'][inside].tolist()
+            rois_px_by_size[(h, w)] = (rois_px, ids)
+        rois_px, ids = rois_px_by_size[(h, w)]
+        
+        page_fills = roi_fill_percentages(img_gray, *rois_px.T)
+        all_fills[n_fills:n_fills + len(page_fills)] = page_fills
+        n_fills += len(page_fills)
+        over = over_buf[:len(page_fills)]
         
-        for roi in template['checkbox_rois_norm']:
-            x = int(roi['x'] * w)
-            y = int(roi['y'] * h)
-            roi_w = int(roi['w'] * w)
-            roi_h = int(roi['h'] * h)
-            
-            if x < 0 or y < 0 or x+roi_w > w or y+roi_h > h:
-                continue
-            
-            fill_pct, _ = analyze_checkbox(img_gray, x, y, roi_w, roi_h)
-            page_fills.append(fill_pct)
-            all_fills.append(fill_pct)
-            
-            # Track high-fill checkboxes
-            if fill_pct > 20:  # Above normal empty box range
-                highest_fills.append({
-                    'page': page_num,
-                    'checkbox': roi['id'],
-                    'fill': fill_pct
-                })
+        # Track high-fill checkboxes
+        np.greater(page_fills, 20, out=over)  # Above normal empty box range
+        count_over_20 = int(over.sum())
+        for i in np.flatnonzero(over):
+            highest_fills.append({
+                'page': page_num,
+                'checkbox': ids[i],
+                'fill': page_fills[i]
+            })
         
-        avg_fill = np.mean(page_fills)
-        max_fill = np.max(page_fills)
-        min_fill = np.min(page_fills)
+        avg_fill = page_fills.mean()
+        max_fill = page_fills.max()
+        min_fill = page_fills.min()
         
         page_stats.append({
             'page': page_num,
             'avg': avg_fill,
             'max': max_fill,
             'min': min_fill,
-            'count_over_20': sum(1 for f in page_fills if f > 20),
-            'count_over_30': sum(1 for f in page_fills if f > 30),
-            'count_over_55': sum(1 for f in page_fills if f >= 55)
+            'count_over_20': count_over_20,
+            'count_over_30': int(np.greater(page_fills, 30, out=over).sum()),
+            'count_over_55': int(np.greater_equal(page_fills, 55, out=over).sum())
         })
         
         print(f"Page {page_num}: avg={avg_fill:.1f}%, max={max_fill:.1f}%, "
@@ -85,30 +111,28 @@ def main():
     print("OVERALL STATISTICS")
     print("="*70)
     
-    overall_avg = np.mean(all_fills)
-    overall_max = np.max(all_fills)
-    overall_min = np.min(all_fills)
-    overall_std = np.std(all_fills)
+    fills = all_fills[:n_fills]
+    overall_avg = fills.mean()
+    overall_max = fills.max()
+    overall_min = fills.min()
+    overall_std = fills.std()
     
-    print(f"Total checkboxes analyzed: {len(all_fills)}")
+    print(f"Total checkboxes analyzed: {len(fills)}")
     print(f"Average fill: {overall_avg:.1f}%")
     print(f"Max fill: {overall_max:.1f}%")
     print(f"Min fill: {overall_min:.1f}%")
     print(f"Std deviation: {overall_std:.1f}%")
     
-    # Count by threshold
-    over_15 = sum(1 for f in all_fills if f >= 15)
-    over_20 = sum(1 for f in all_fills if f >= 20)
-    over_30 = sum(1 for f in all_fills if f >= 30)
-    over_40 = sum(1 for f in all_fills if f >= 40)
-    over_55 = sum(1 for f in all_fills if f >= 55)
+    # Count by threshold: one sort, then a binary search per cut-off
+    over_15, over_20, over_30, over_40, over_55 = (
+        len(fills) - np.searchsorted(np.sort(fills), [15, 20, 30, 40, 55], side='left')).tolist()
     
     print(f"\nCheckboxes by fill threshold:")
-    print(f"  ≥15%: {over_15} ({over_15/len(all_fills)*100:.1f}%)")
-    print(f"  ≥20%: {over_20} ({over_20/len(all_fills)*100:.1f}%)")
-    print(f"  ≥30%: {over_30} ({over_30/len(all_fills)*100:.1f}%)")
-    print(f"  ≥40%: {over_40} ({over_40/len(all_fills)*100:.1f}%)")
-    print(f"  ≥55%: {over_55} ({over_55/len(all_fills)*100:.1f}%) ← Current threshold")
+    print(f"  ≥15%: {over_15} ({over_15/len(fills)*100:.1f}%)")
+    print(f"  ≥20%: {over_20} ({over_20/len(fills)*100:.1f}%)")
+    print(f"  ≥30%: {over_30} ({over_30/len(fills)*100:.1f}%)")
+    print(f"  ≥40%: {over_40} ({over_40/len(fills)*100:.1f}%)")
+    print(f"  ≥55%: {over_55} ({over_55/len(fills)*100:.1f}%) ← Current threshold")
     
     if highest_fills:
         print(f"\n" + "="*70)
@@ -236,14 +236,17 @@ def main():
             
             # Make headers bold and colored
             from openpyxl.styles import Font, PatternFill
+            header_font = Font(bold=True, color="FFFFFF")
+            ocr_fill = PatternFill(start_color="366092", end_color="366092", fill_type="solid")
+            manual_fill = PatternFill(start_color="FFC000", end_color="FFC000", fill_type="solid")
             for col in range(1, len(dfq.columns) + 1):
                 cell = ws.cell(row=1, column=col)
-                cell.font = Font(bold=True, color="FFFFFF")
+                cell.font = header_font
                 # OCR columns in blue, manual grading columns in orange
                 if col <= 11:  # OCR data columns
-                    cell.fill = PatternFill(start_color="366092", end_color="366092", fill_type="solid")
+                    cell.fill = ocr_fill
                 else:  # Manual grading columns
-                    cell.fill = PatternFill(start_color="FFC000", end_color="FFC000", fill_type="solid")
+                    cell.fill = manual_fill
             
             # Add data validation dropdowns for manual columns
             # "reviewed" column
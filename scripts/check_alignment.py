@@ -1,12 +1,22 @@
 #!/usr/bin/env python3
 from __future__ import annotations
-import argparse, json, pathlib
+import argparse, json, os, pathlib
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 import numpy as np, cv2, yaml
-from scripts.common import read_json, write_json_atomic, latest_run_dir, sorted_pages, tpl_size, anchors_norm, residual_l2
+from scripts.common import imread_gray, read_json, write_json_atomic, latest_run_dir, sorted_pages, tpl_size, anchors_norm, residuals_l2, otsu_threshold, inv3x3
+
+try:
+    from numba import njit
+except ImportError:
+    njit = None
+
+# 5x5 Gaussian (sigma derived from size) built once instead of on every blur
+_GAUSS_K5 = cv2.getGaussianKernel(5, 0)
 
 def binarize(gray):
-    blur = cv2.GaussianBlur(gray, (5,5), 0)
-    _, b = cv2.threshold(blur, 0, 255, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)
+    blur = cv2.sepFilter2D(gray, -1, _GAUSS_K5, _GAUSS_K5)
+    _, b = cv2.threshold(blur, otsu_threshold(blur), 255, cv2.THRESH_BINARY_INV)
     return b
 
 def refine_anchor(bin_img, approx_xy, win=60):
@@ -16,16 +26,77 @@ def refine_anchor(bin_img, approx_xy, win=60):
     y0, y1 = max(0, ay-win), min(h, ay+win)
     roi = bin_img[y0:y1, x0:x1]
     if roi.size==0: return np.float32([ax, ay])
-    cnts, _ = cv2.findContours(roi, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-    if not cnts: return np.float32([ax, ay])
-    cnt = max(cnts, key=cv2.contourArea)
-    M = cv2.moments(cnt)
-    if M["m00"] == 0:
-        cx, cy = cnt.reshape(-1,2).mean(axis=0)
-    else:
-        cx, cy = (M["m10"]/M["m00"], M["m01"]/M["m00"])
+    n, _, stats, cents = cv2.connectedComponentsWithStats(roi, connectivity=8, ltype=cv2.CV_32S)
+    if n < 2: return np.float32([ax, ay])
+    largest = 1 + int(np.argmax(stats[1:, cv2.CC_STAT_AREA]))
+    cx, cy = cents[largest]
     return np.float32([x0+cx, y0+cy])
 
+if njit is not None:
+    # Serial on purpose: pages already run on a thread pool, and numba's
+    # default threading layer cannot be entered from several threads at once.
+    # nogil lets those worker threads refine their pages concurrently.
+    @njit(cache=True, nogil=True)
+    def refine_anchors_nb(bin_img, approx_xy, win):
+        """Centroid of the largest 8-connected blob around each approximate anchor."""
+        h, w = bin_img.shape
+        n = approx_xy.shape[0]
+        out = np.empty((n, 2), dtype=np.float32)
+        for k in range(n):
+            ax, ay = int(approx_xy[k, 0]), int(approx_xy[k, 1])
+            x0, x1 = max(0, ax-win), min(w, ax+win)
+            y0, y1 = max(0, ay-win), min(h, ay+win)
+            out[k, 0], out[k, 1] = ax, ay
+            if x1 <= x0 or y1 <= y0: continue
+            rw, rh = x1-x0, y1-y0
+            seen = np.zeros((rh, rw), dtype=np.uint8)
+            stack_x = np.empty(rh*rw, dtype=np.int32)
+            stack_y = np.empty(rh*rw, dtype=np.int32)
+            best, best_sx, best_sy = 0, 0, 0
+            for sy in range(rh):
+                for sx in range(rw):
+                    if seen[sy, sx] or bin_img[y0+sy, x0+sx] == 0: continue
+                    seen[sy, sx] = 1
+                    stack_x[0], stack_y[0] = sx, sy
+                    top, count, sum_x, sum_y = 1, 0, 0, 0
+                    while top > 0:
+                        top -= 1
+                        px, py = stack_x[top], stack_y[top]
+                        count += 1; sum_x += px; sum_y += py
+                        for dy in range(-1, 2):
+                            for dx in range(-1, 2):
+                                qx, qy = px+dx, py+dy
+                                if qx < 0 or qy < 0 or qx >= rw or qy >= rh: continue
+                                if seen[qy, qx] or bin_img[y0+qy, x0+qx] == 0: continue
+                                seen[qy, qx] = 1
+                                stack_x[top], stack_y[top] = qx, qy
+                                top += 1
+                    if count > best:
+                        best, best_sx, best_sy = count, sum_x, sum_y
+            if best > 0:
+                out[k, 0] = x0 + best_sx / best
+                out[k, 1] = y0 + best_sy / best
+        return out
+
+def refine_anchors(bin_img, approx, win=60):
+    if njit is not None:
+        return refine_anchors_nb(bin_img, np.ascontiguousarray(approx, dtype=np.float32), win)
+    return np.float32([refine_anchor(bin_img, p, win) for p in approx])
+
+def process_page(img_path, anchors_xy, tpl_w, tpl_h, search_px, ransacth):
+    gray = imread_gray(img_path)
+    b = binarize(gray); ih, iw = gray.shape[:2]
+
+    approx = anchors_xy * np.float32([iw, ih])
+    src = refine_anchors(b, approx, search_px)
+    dst = anchors_xy * np.float32([tpl_w, tpl_h])
+
+    M, _ = cv2.findHomography(src, dst, cv2.RANSAC, ransacth)
+    if M is None or not np.all(np.isfinite(M)):
+        sx, sy = tpl_w/iw, tpl_h/ih
+        M = np.float32([[sx,0,0],[0,sy,0],[0,0,1]])
+    return img_path.name, M, src, dst
+
 def main():
     ap = argparse.ArgumentParser()
     ap.add_argument("--template", required=True)
@@ -35,7 +106,7 @@ def main():
 
     tpl = read_json(args.template)
     tpl_w, tpl_h = tpl_size(tpl)
-    anchors = anchors_norm(tpl)
+    anchors_xy = np.float32([[a["x"], a["y"]] for a in anchors_norm(tpl)])
 
     cfg = {}
     p = pathlib.Path("configs/ocr.yaml")
@@ -53,23 +124,16 @@ def main():
     pages = sorted_pages(images_dir)
     if not pages: raise SystemExit("No page_*.png in images")
 
-    for img_path in pages:
-        img = cv2.imread(str(img_path)); gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-        b = binarize(gray); ih, iw = gray.shape[:2]
-
-        approx = np.float32([[iw*a["x"], ih*a["y"]] for a in anchors])
-        src = np.float32([refine_anchor(b, p, args.search_px) for p in approx])
-        dst = np.float32([[tpl_w*a["x"], tpl_h*a["y"]] for a in anchors])
-
-        M, _ = cv2.findHomography(src, dst, cv2.RANSAC, args.ransacth)
-        if M is None or not np.all(np.isfinite(M)):
-            sx, sy = tpl_w/iw, tpl_h/ih
-            M = np.float32([[sx,0,0],[0,sy,0],[0,0,1]])
+    work = partial(process_page, anchors_xy=anchors_xy, tpl_w=tpl_w, tpl_h=tpl_h, search_px=args.search_px,
+                   ransacth=args.ransacth)
+    with ThreadPoolExecutor(max_workers=os.cpu_count()) as ex:
+        names, Ms, srcs, dsts = zip(*ex.map(work, pages))
 
-        residual = residual_l2(M, src, dst)
+    # Residuals for every page in one batched projection
+    residuals = residuals_l2(np.stack(Ms).astype(np.float64), np.stack(srcs), np.stack(dsts))
+    for name, M, residual in zip(names, Ms, residuals.tolist()):
         quality = "ok" if residual <= warn_px else ("warn" if residual <= fail_px else "fail")
-        Minv = np.linalg.inv(M)
-        homos["pages"][img_path.name] = {"M":M.tolist(),"Minv":Minv.tolist(),"residual_px":residual,"quality":quality}
+        homos["pages"][name] = {"M":M,"Minv":inv3x3(M),"residual_px":residual,"quality":quality}
 
     write_json_atomic(logs_dir/"homography.json", homos)
     with open(logs_dir/"steps.jsonl","a") as f:
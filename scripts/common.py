@@ -1,19 +1,76 @@
 # scripts/common.py
 from __future__ import annotations
 import json, pathlib, tempfile, os
+from functools import lru_cache
 import numpy as np, cv2
 
+try:
+    import orjson  # optional: much faster for the numeric-heavy run JSON
+except ImportError:
+    orjson = None
+
+try:
+    import pyarrow as pa, pyarrow.parquet as pq  # optional: columnar copy of the OCR results
+except ImportError:
+    pa = pq = None
+
+try:
+    from numba import njit, prange  # optional: compiled per-ROI fill counts
+except ImportError:
+    njit = None
+
+def _json_default(o):
+    if isinstance(o, np.ndarray): return o.tolist()
+    if isinstance(o, np.generic): return o.item()
+    raise TypeError(f"Object of type {type(o).__name__} is not JSON serializable")
+
 def read_json(path):
+    if orjson is not None:
+        return orjson.loads(pathlib.Path(path).read_bytes())
     with open(path, "r", encoding="utf-8") as f:
         return json.load(f)
 
 def write_json_atomic(path, obj, indent=2):
+    """Atomically write obj as JSON; NumPy arrays and scalars are serialized as lists/numbers."""
     path = pathlib.Path(path)
     path.parent.mkdir(parents=True, exist_ok=True)
-    with tempfile.NamedTemporaryFile("w", delete=False, encoding="utf-8", dir=str(path.parent)) as tf:
-        json.dump(obj, tf, indent=indent)
-        tmp = tf.name
+    if orjson is not None and indent in (None, 2):
+        opts = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS | (orjson.OPT_INDENT_2 if indent else 0)
+        data = orjson.dumps(obj, option=opts, default=_json_default)
+        with tempfile.NamedTemporaryFile("wb", delete=False, dir=str(path.parent)) as tf:
+            tf.write(data)
+            tmp = tf.name
+    else:
+        with tempfile.NamedTemporaryFile("w", delete=False, encoding="utf-8", dir=str(path.parent)) as tf:
+            json.dump(obj, tf, indent=indent, default=_json_default)
+            tmp = tf.name
+    os.replace(tmp, path)
+
+def write_results_parquet(path, out_pages):
+    """Write run_ocr's per-page results as Parquet next to the JSON; no-op without pyarrow.
+
+    One row per page with the checkboxes as a list<struct<id, score, checked>>
+    column; scores stay float64 so they round-trip exactly.
+    """
+    path = pathlib.Path(path)
+    if pa is None:
+        path.unlink(missing_ok=True)  # never leave a stale copy for read_results to prefer
+        return False
+    box = pa.struct([("id", pa.string()), ("score", pa.float64()), ("checked", pa.bool_())])
+    schema = pa.schema([("page", pa.string()), ("text_len", pa.int32()),
+                        ("checkboxes", pa.list_(box)), ("checkbox_checked_total", pa.int32())])
+    tmp = path.with_name(path.name + ".tmp")
+    pq.write_table(pa.Table.from_pylist(out_pages, schema=schema), tmp, compression="zstd")
     os.replace(tmp, path)
+    return True
+
+def read_results(step4_dir):
+    """run_ocr results as a list of page dicts, from results.parquet when pyarrow can read it."""
+    step4_dir = pathlib.Path(step4_dir)
+    parquet = step4_dir / "results.parquet"
+    if pq is not None and parquet.exists():
+        return pq.read_table(parquet).to_pylist()
+    return read_json(step4_dir / "results.json")
 
 def latest_run_dir(root="artifacts"):
     root = pathlib.Path(root)
@@ -24,6 +81,48 @@ def latest_run_dir(root="artifacts"):
 def sorted_pages(images_dir):
     return sorted(pathlib.Path(images_dir).glob("page_*.png"))
 
+def imread_gray(path):
+    """Grayscale page identical to imread + cvtColor(BGR2GRAY), without a 3-channel decode of gray PNGs.
+
+    IMREAD_GRAYSCALE is not used: libpng's own gray conversion of colour PNGs comes out a level
+    darker on about half the pixels, which biases fill scores toward "checked".
+    """
+    img = cv2.imread(str(path), cv2.IMREAD_UNCHANGED)
+    if img is None: return None
+    if img.dtype != np.uint8: img = cv2.imread(str(path))  # 16-bit: let imread do its usual 8-bit reduction
+    if img.ndim == 3:
+        img = cv2.cvtColor(img, cv2.COLOR_BGRA2GRAY if img.shape[2] == 4 else cv2.COLOR_BGR2GRAY)
+    return img
+
+@lru_cache(maxsize=4)
+def _load_template(path):
+    return read_json(path)
+
+def load_template(path):
+    """Parsed template.json, loaded once per resolved path; treat the result as read-only."""
+    return _load_template(str(pathlib.Path(path).resolve()))
+
+def load_yaml(path):
+    """Parse a YAML config with libyaml's CSafeLoader when PyYAML was built with it."""
+    import yaml
+    loader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+    with open(path, "r", encoding="utf-8") as f:
+        return yaml.load(f, Loader=loader)
+
+def rois_as_array(tpl):
+    """checkbox_rois_norm as (ids, (N, 4) float64 x, y, w, h) for vectorized pixel conversion."""
+    rois = tpl["checkbox_rois_norm"]
+    norm = np.array([(r["x"], r["y"], r["w"], r["h"]) for r in rois], dtype=np.float64).reshape(-1, 4)
+    return [r["id"] for r in rois], norm
+
+# Normalized template ROIs as one structured array
+ROI_DTYPE = np.dtype([("x", "f8"), ("y", "f8"), ("w", "f8"), ("h", "f8"), ("id", "U16")])
+
+def rois_as_records(tpl):
+    """checkbox_rois_norm as a ROI_DTYPE structured array (boxes and ids in one record per ROI)."""
+    return np.array([(r["x"], r["y"], r["w"], r["h"], r["id"]) for r in tpl["checkbox_rois_norm"]],
+                    dtype=ROI_DTYPE)
+
 def tpl_size(tpl):
     page = tpl.get("page_size", {"width_px": 2550, "height_px": 3300})
     return int(page["width_px"]), int(page["height_px"])
@@ -46,3 +145,106 @@ def residual_l2(M, src, dst):
     proj = (M @ src_h.T).T
     proj = proj[:,:2] / proj[:,2:3]
     return float(np.linalg.norm(proj - dst, axis=1).mean())
+
+def residuals_l2(Ms, srcs, dsts):
+    """residual_l2 for a batch: Ms (N,3,3), srcs/dsts (N,K,2) -> (N,) mean errors."""
+    srcs_h = np.concatenate([srcs, np.ones(srcs.shape[:2] + (1,))], axis=-1)
+    proj = np.einsum('nij,nkj->nki', Ms, srcs_h)
+    proj = proj[..., :2] / proj[..., 2:]
+    return np.linalg.norm(proj - dsts, axis=-1).mean(axis=1)
+
+def otsu_threshold(gray):
+    """cv2.THRESH_OTSU level for one uint8 image (pixels > t are the bright class).
+
+    Exact, via otsu_from_hist on the image's 256-bin histogram; a uniform image
+    gives 0 as cv2 does.
+    """
+    return int(otsu_from_hist(cv2.calcHist([gray], [0], None, [256], [0, 256]).ravel()))
+
+def otsu_from_hist(hist):
+    """Otsu thresholds for a stack of 256-bin histograms, shape (..., 256) -> (...) int.
+
+    Evaluates the between-class variance at every level with cumulative sums in
+    one vectorized pass; ties go to the lowest level and a single-valued
+    histogram gives 0, as with cv2.THRESH_OTSU.
+    """
+    hist = np.asarray(hist, dtype=np.float64)
+    cum_p = np.cumsum(hist, axis=-1)
+    cum_jp = np.cumsum(hist * np.arange(256), axis=-1)
+    n, total = cum_p[..., -1:], cum_jp[..., -1:]
+    w01 = cum_p * (n - cum_p)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        between = np.where(w01 > 0, (n*cum_jp - total*cum_p)**2 / w01, 0.0)
+    return np.argmax(between, axis=-1)
+
+def patch_histograms(patches):
+    """256-bin histograms of an (N, h, w) uint8 stack in one bincount, shape (N, 256)."""
+    n = len(patches)
+    offsets = (np.arange(n, dtype=np.intp) * 256)[:, None]
+    flat = patches.reshape(n, -1) + offsets
+    return np.bincount(flat.ravel(), minlength=n * 256).reshape(n, 256)
+
+def otsu_fills(gray, rois_px):
+    """Per-ROI Otsu levels and fill percentages for an (N, 4) x, y, w, h array -> (fills, thresholds).
+
+    Same-size ROIs (the normal case for one template) are gathered into one (N, h, w)
+    stack, so the levels come from one batched histogram and the fills from a single
+    fill_percentages pass; mixed sizes are handled one crop at a time.
+    """
+    xs, ys, ws, hs = rois_px.T
+    if len(rois_px) and (ws == ws[0]).all() and (hs == hs[0]).all():
+        patches = np.lib.stride_tricks.sliding_window_view(gray, (hs[0], ws[0]))[ys, xs]
+        thresholds = otsu_from_hist(patch_histograms(patches)).astype(np.float64)
+        return fill_percentages(patches, thresholds), thresholds
+    patches = [gray[y:y+rh, x:x+rw] for x, y, rw, rh in rois_px.tolist()]
+    thresholds = np.array([cv2.threshold(p, 0, 255, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)[0]
+                           for p in patches])
+    return np.array([fill_below(p, t) for p, t in zip(patches, thresholds)]), thresholds
+
+if njit is not None:
+    @njit(parallel=True, cache=True, fastmath=True)
+    def fill_percentages(patches, thresholds):
+        """Percent of pixels <= each patch's threshold (THRESH_BINARY_INV fill) for an (N, h, w) stack"""
+        n, ph, pw = patches.shape
+        out = np.empty(n)
+        for i in prange(n):
+            t = thresholds[i]
+            count = 0
+            for y in range(ph):
+                for x in range(pw):
+                    if patches[i, y, x] <= t:
+                        count += 1
+            out[i] = count * 100.0 / (ph * pw)
+        return out
+
+    @njit(cache=True, fastmath=True)
+    def fill_below(patch, cutoff):
+        """Percent of pixels <= cutoff in one patch, without materializing a binary mask"""
+        count = 0
+        for y in range(patch.shape[0]):
+            for x in range(patch.shape[1]):
+                if patch[y, x] <= cutoff:
+                    count += 1
+        return count * 100.0 / patch.size
+else:
+    def fill_percentages(patches, thresholds):
+        """Percent of pixels <= each patch's threshold (THRESH_BINARY_INV fill) for an (N, h, w) stack"""
+        return (patches <= thresholds[:, None, None]).mean(axis=(1, 2)) * 100
+
+    def fill_below(patch, cutoff):
+        """Percent of pixels <= cutoff in one patch"""
+        return cv2.countNonZero((patch <= cutoff).view(np.uint8)) * 100.0 / patch.size
+
+def inv3x3(M):
+    """Closed-form inverse of a 3x3 matrix (adjugate / determinant).
+
+    Avoids the LAPACK dispatch of np.linalg.inv for the per-page homographies;
+    raises np.linalg.LinAlgError for singular input like np.linalg.inv does.
+    """
+    a, b, c, d, e, f, g, h, i = np.asarray(M, dtype=np.float64).ravel().tolist()
+    A, B, C = e*i - f*h, f*g - d*i, d*h - e*g
+    det = a*A + b*B + c*C
+    if det == 0: raise np.linalg.LinAlgError("Singular matrix")
+    return np.array([[A, c*h - b*i, b*f - c*e],
+                     [B, a*i - c*g, c*d - a*f],
+                     [C, b*g - a*h, a*e - b*d]]) / det
@@ -3,10 +3,12 @@
 Convert alignment_results.json to homography.json format for backward compatibility.
 This allows the OCR scripts to use the alignment data from step2.
 """
-import json
 import numpy as np
 from pathlib import Path
 import argparse
+import sys
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))  # repo root, so scripts.common imports without PYTHONPATH
+from scripts.common import inv3x3, read_json, write_json_atomic
 
 
 def convert_alignment_to_homography(run_dir):
@@ -21,8 +23,7 @@ def convert_alignment_to_homography(run_dir):
     if not alignment_file.exists():
         raise FileNotFoundError(f"Alignment results not found: {alignment_file}")
     
-    with open(alignment_file) as f:
-        alignment_data = json.load(f)
+    alignment_data = read_json(alignment_file)
     
     # Output: homography format for OCR scripts
     homography = {"pages": {}}
@@ -39,13 +40,13 @@ def convert_alignment_to_homography(run_dir):
             
             # Compute inverse for reverse transformation
             try:
-                Minv = np.linalg.inv(M).tolist()
+                Minv = inv3x3(M)
             except np.linalg.LinAlgError:
                 print(f"Warning: Could not invert matrix for {page_name}")
-                Minv = M.tolist()  # Fallback to forward matrix
+                Minv = M  # Fallback to forward matrix
             
             homography["pages"][page_name] = {
-                "M": M.tolist(),
+                "M": M,
                 "Minv": Minv
             }
     
@@ -54,8 +55,7 @@ def convert_alignment_to_homography(run_dir):
     logs_dir.mkdir(exist_ok=True)
     output_file = logs_dir / "homography.json"
     
-    with open(output_file, "w") as f:
-        json.dump(homography, f, indent=2)
+    write_json_atomic(output_file, homography)
     
     print(f"✅ Created homography.json")
     print(f"   Input:  {alignment_file}")
@@ -2,13 +2,14 @@
 """
 Convert alignment_results.json to homography.json format expected by run_ocr.py
 """
-import json
+import sys
 from pathlib import Path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))  # repo root, so scripts.common imports without PYTHONPATH
+from scripts.common import read_json, write_json_atomic
 
 # Read alignment results
 alignment_file = Path("artifacts/run_20251001_185300/02_step2_alignment_and_crop/alignment_results.json")
-with open(alignment_file) as f:
-    alignment_data = json.load(f)
+alignment_data = read_json(alignment_file)
 
 # Create homography format
 homography = {
@@ -27,8 +28,7 @@ for page_data in alignment_data["pages"]:
 
 # Save to logs directory
 output_file = Path("artifacts/run_20251001_185300/logs/homography.json")
-with open(output_file, "w") as f:
-    json.dump(homography, f, indent=2)
+write_json_atomic(output_file, homography)
 
 print(f"✅ Created {output_file}")
 print(f"   Pages processed: {len(homography['pages'])}")
@@ -6,10 +6,56 @@ import cv2
 import numpy as np
 import json
 import sys
+from multiprocessing import Pool, cpu_count
 from pathlib import Path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))  # repo root, so scripts.common imports without PYTHONPATH
+from scripts.common import rois_as_records
 
-def create_overlay_for_page(img_path, template, output_path):
-    """Create an overlay showing all checkbox ROIs on one page"""
+# Set once per worker process by _init_worker so ROIs are not pickled per task
+_ROIS = None
+_LAYER_CACHE = {}
+
+def _init_worker(rois):
+    global _ROIS
+    _ROIS = rois
+
+def _overlay_task(args):
+    img_path, output_path = args
+    return img_path, output_path, create_overlay_for_page(img_path, _ROIS, output_path)
+
+def roi_layer(h, w, rois):
+    """Render all ROI rectangles and labels once per page size.
+
+    Returns (idx, alpha, color): the flat indices of the pixels the drawing
+    touches, their coverage, and the drawn color premultiplied by coverage.
+    Aligned pages share dimensions, so every page after the first reuses it.
+    """
+    key = (h, w)
+    if key not in _LAYER_CACHE:
+        layer = np.zeros((h, w, 3), dtype=np.uint8)
+        mask = np.zeros((h, w), dtype=np.uint8)
+        xs = (rois['x'] * w).astype(int).tolist()
+        ys = (rois['y'] * h).astype(int).tolist()
+        ws = (rois['w'] * w).astype(int).tolist()
+        hs = (rois['h'] * h).astype(int).tolist()
+        for x, y, roi_w, roi_h, roi_id in zip(xs, ys, ws, hs, rois['id'].tolist()):
+            for canvas, color in ((layer, (0, 255, 0)), (mask, 255)):
+                # Draw green rectangle
+                cv2.rectangle(canvas, (x, y), (x+roi_w, y+roi_h), color, 2)
+                
+                # Add label
+                cv2.putText(canvas, roi_id, (x, y-5),
+                           cv2.FONT_HERSHEY_SIMPLEX, 0.5, color, 2)
+        idx = np.flatnonzero(mask)
+        alpha = mask.reshape(-1)[idx, None] / 255.0
+        _LAYER_CACHE[key] = (idx, alpha, layer.reshape(-1, 3)[idx])
+    return _LAYER_CACHE[key]
+
+def create_overlay_for_page(img_path, rois, output_path):
+    """Create an overlay showing all checkbox ROIs on one page
+
+    rois is a ROI_DTYPE structured array of normalized boxes and their ids.
+    """
     img = cv2.imread(str(img_path))
     if img is None:
         print(f"  ⚠️  Could not load {img_path.name}")
@@ -18,19 +64,10 @@ def create_overlay_for_page(img_path, template, output_path):
     h, w = img.shape[:2]
     overlay = img.copy()
     
-    # Draw all checkbox ROIs
-    for roi in template['checkbox_rois_norm']:
-        x = int(roi['x'] * w)
-        y = int(roi['y'] * h)
-        roi_w = int(roi['w'] * w)
-        roi_h = int(roi['h'] * h)
-        
-        # Draw green rectangle
-        cv2.rectangle(overlay, (x, y), (x+roi_w, y+roi_h), (0, 255, 0), 2)
-        
-        # Add label
-        cv2.putText(overlay, roi['id'], (x, y-5),
-                   cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 0), 2)
+    # Composite the shared ROI drawing onto the page
+    idx, alpha, color = roi_layer(h, w, rois)
+    flat = overlay.reshape(-1, 3)
+    flat[idx] = (flat[idx] * (1 - alpha) + color + 0.5).astype(np.uint8)
     
     cv2.imwrite(str(output_path), overlay)
     return True
@@ -52,6 +89,7 @@ def main():
         template = json.load(f)
     
     print(f"Loaded template with {len(template['checkbox_rois_norm'])} checkbox ROIs")
+    rois = rois_as_records(template)
     
     # Find all aligned cropped images
     aligned_dir = run_dir / "02_step2_alignment_and_crop/aligned_cropped"
@@ -71,19 +109,21 @@ def main():
     output_dir.mkdir(exist_ok=True)
     print(f"Output directory: {output_dir}")
     
-    # Process all pages
-    success_count = 0
+    # Process all pages in parallel
+    tasks = []
     for img_path in image_files:
         page_name = img_path.stem  # e.g., "page_0001_aligned_cropped"
         page_num = page_name.split('_')[1]  # e.g., "0001"
-        output_path = output_dir / f"page_{page_num}_overlay.png"
-        
-        print(f"Processing {img_path.name}...", end=" ")
-        if create_overlay_for_page(img_path, template, output_path):
-            print(f"✅ Saved to {output_path.name}")
-            success_count += 1
-        else:
-            print("❌ Failed")
+        tasks.append((img_path, output_dir / f"page_{page_num}_overlay.png"))
+    
+    success_count = 0
+    with Pool(cpu_count(), initializer=_init_worker, initargs=(rois,)) as pool:
+        for img_path, output_path, ok in pool.imap_unordered(_overlay_task, tasks, chunksize=4):
+            if ok:
+                print(f"Processing {img_path.name}... ✅ Saved to {output_path.name}")
+                success_count += 1
+            else:
+                print(f"Processing {img_path.name}... ❌ Failed")
     
     print(f"\n{'='*60}")
     print(f"✅ Successfully processed {success_count}/{len(image_files)} pages")
@@ -46,26 +46,29 @@ def create_anchor_reference_image(image_path, template_path, output_path=None):
     grid_size = 50
     thick_grid = 100
     
-    # Thin grid lines (light gray)
-    for x in range(0, w, grid_size):
-        color = (100, 100, 255) if x % thick_grid == 0 else (200, 200, 200)
-        thickness = 2 if x % thick_grid == 0 else 1
-        cv2.line(result, (x, 0), (x, h), color, thickness)
+    # Thin grid lines (light gray) are single-pixel, so paint them as whole
+    # columns/rows at once; only the thick lines go through cv2.line
+    xs_thick = np.arange(0, w, thick_grid)
+    xs_thin = np.setdiff1d(np.arange(0, w, grid_size), xs_thick)
+    result[:, xs_thin] = (200, 200, 200)
+    for x in xs_thick:
+        x = int(x)
+        cv2.line(result, (x, 0), (x, h), (100, 100, 255), 2)
         
         # Add X coordinate labels on thick lines
-        if x % thick_grid == 0:
-            cv2.putText(result, f"X:{x}", (x+5, 25), 
-                       cv2.FONT_HERSHEY_SIMPLEX, 0.6, (100, 100, 255), 2)
-    
-    for y in range(0, h, grid_size):
-        color = (100, 100, 255) if y % thick_grid == 0 else (200, 200, 200)
-        thickness = 2 if y % thick_grid == 0 else 1
-        cv2.line(result, (0, y), (w, y), color, thickness)
+        cv2.putText(result, f"X:{x}", (x+5, 25), 
+                   cv2.FONT_HERSHEY_SIMPLEX, 0.6, (100, 100, 255), 2)
+    
+    ys_thick = np.arange(0, h, thick_grid)
+    ys_thin = np.setdiff1d(np.arange(0, h, grid_size), ys_thick)
+    result[ys_thin, :] = (200, 200, 200)
+    for y in ys_thick:
+        y = int(y)
+        cv2.line(result, (0, y), (w, y), (100, 100, 255), 2)
         
         # Add Y coordinate labels on thick lines
-        if y % thick_grid == 0:
-            cv2.putText(result, f"Y:{y}", (10, y+20), 
-                       cv2.FONT_HERSHEY_SIMPLEX, 0.6, (100, 100, 255), 2)
+        cv2.putText(result, f"Y:{y}", (10, y+20), 
+                   cv2.FONT_HERSHEY_SIMPLEX, 0.6, (100, 100, 255), 2)
     
     # Draw expected anchor positions
     for i, (anchor, label) in enumerate(zip(anchors_norm, anchor_labels)):
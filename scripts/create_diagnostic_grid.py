@@ -3,13 +3,54 @@
 Create a diagnostic grid overlay to help identify exact checkbox positions.
 Shows a measurement grid with coordinates to verify alignment.
 """
-import cv2
-import numpy as np
 import argparse
 from pathlib import Path
 
+# cv2/numpy are imported inside the drawing functions so --help and a
+# missing --input fail fast without loading them
+
+# Rasterized label tiles keyed by (text, scale, thickness): (coverage mask, x pad, y offset)
+_LABEL_CACHE = {}
+
+def put_label(img, text, org, scale, color, thickness):
+    """cv2.putText with FONT_HERSHEY_SIMPLEX, rasterizing each distinct label only once.
+
+    The first use renders the string into a small coverage tile; every later
+    placement is a blend of that tile into img at org.
+    """
+    import cv2
+    import numpy as np
+    
+    key = (text, scale, thickness)
+    if key not in _LABEL_CACHE:
+        (tw, th), baseline = cv2.getTextSize(text, cv2.FONT_HERSHEY_SIMPLEX, scale, thickness)
+        pad = thickness + 2
+        tile = np.zeros((th + baseline + 2 * pad, tw + 2 * pad), dtype=np.uint8)
+        cv2.putText(tile, text, (pad, th + pad), cv2.FONT_HERSHEY_SIMPLEX, scale, 255, thickness)
+        _LABEL_CACHE[key] = (tile, pad, th + pad)
+    tile, dx, dy = _LABEL_CACHE[key]
+    
+    # Clip the tile to the image
+    x0, y0 = org[0] - dx, org[1] - dy
+    th, tw = tile.shape
+    ix0, iy0 = max(x0, 0), max(y0, 0)
+    ix1, iy1 = min(x0 + tw, img.shape[1]), min(y0 + th, img.shape[0])
+    if ix0 >= ix1 or iy0 >= iy1:
+        return
+    alpha = tile[iy0 - y0:iy1 - y0, ix0 - x0:ix1 - x0, None] / 255.0
+    region = img[iy0:iy1, ix0:ix1]
+    region[:] = (region * (1 - alpha) + np.array(color) * alpha + 0.5).astype(np.uint8)
+
+def thick_line_band(positions, limit):
+    """Pixel columns/rows covered by 2px-thick cv2.line calls at positions (pos-1..pos+1)."""
+    import numpy as np
+    band = (positions[:, None] + np.arange(-1, 2)).ravel()
+    return np.unique(band[(band >= 0) & (band < limit)])
+
 def create_diagnostic_overlay(img_path, output_path):
     """Create diagnostic overlay with measurement grid and coordinates."""
+    import cv2
+    import numpy as np
     
     # Load image
     img = cv2.imread(str(img_path))
@@ -27,51 +68,52 @@ def create_diagnostic_overlay(img_path, output_path):
     COLOR_EXPECTED_X = (0, 165, 255)  # Orange - expected X lines
     COLOR_EXPECTED_Y = (255, 0, 255)  # Magenta - expected Y lines
     
+    # Grid lines are axis-aligned, so paint whole columns/rows with slice
+    # assignment instead of one cv2.line call per line
+    xs_minor = np.arange(0, width, 50)
+    ys_minor = np.arange(0, height, 50)
+    xs_major = np.arange(0, width, 100)
+    ys_major = np.arange(0, height, 100)
+    
     # Draw minor grid (every 50px)
-    for x in range(0, width, 50):
-        cv2.line(overlay, (x, 0), (x, height), COLOR_MINOR, 1)
-    for y in range(0, height, 50):
-        cv2.line(overlay, (0, y), (width, y), COLOR_MINOR, 1)
+    overlay[:, xs_minor] = COLOR_MINOR
+    overlay[ys_minor, :] = COLOR_MINOR
     
     # Draw major grid (every 100px) with labels
-    for x in range(0, width, 100):
-        cv2.line(overlay, (x, 0), (x, height), COLOR_MAJOR, 2)
+    overlay[:, thick_line_band(xs_major, width)] = COLOR_MAJOR
+    for x in xs_major.tolist():
+        text = str(x)
         # Add coordinate label at top
-        cv2.putText(overlay, str(x), (x+5, 20), 
-                   cv2.FONT_HERSHEY_SIMPLEX, 0.5, COLOR_TEXT, 2)
+        put_label(overlay, text, (x+5, 20), 0.5, COLOR_TEXT, 2)
         # Add coordinate label at bottom
-        cv2.putText(overlay, str(x), (x+5, height-10), 
-                   cv2.FONT_HERSHEY_SIMPLEX, 0.5, COLOR_TEXT, 2)
+        put_label(overlay, text, (x+5, height-10), 0.5, COLOR_TEXT, 2)
     
-    for y in range(0, height, 100):
-        cv2.line(overlay, (0, y), (width, y), COLOR_MAJOR, 2)
+    overlay[thick_line_band(ys_major, height), :] = COLOR_MAJOR
+    for y in ys_major.tolist():
+        text = str(y)
         # Add coordinate label at left
-        cv2.putText(overlay, str(y), (5, y+20), 
-                   cv2.FONT_HERSHEY_SIMPLEX, 0.5, COLOR_TEXT, 2)
+        put_label(overlay, text, (5, y+20), 0.5, COLOR_TEXT, 2)
         # Add coordinate label at right
-        cv2.putText(overlay, str(y), (width-60, y+20), 
-                   cv2.FONT_HERSHEY_SIMPLEX, 0.5, COLOR_TEXT, 2)
+        put_label(overlay, text, (width-60, y+20), 0.5, COLOR_TEXT, 2)
     
     # Draw EXPECTED checkbox X positions (vertical lines in orange)
     expected_x = [280, 690, 1100, 1505, 1915]
     for x in expected_x:
-        cv2.line(overlay, (x, 0), (x, height), COLOR_EXPECTED_X, 3)
+        cv2.line(overlay, (x, 0), (x, height), COLOR_EXPECTED_X, 3, cv2.LINE_4)
         # Label at multiple heights for visibility
-        cv2.putText(overlay, f"X:{x}", (x+5, 50), 
-                   cv2.FONT_HERSHEY_SIMPLEX, 0.6, COLOR_EXPECTED_X, 2)
-        cv2.putText(overlay, f"X:{x}", (x+5, height//2), 
-                   cv2.FONT_HERSHEY_SIMPLEX, 0.6, COLOR_EXPECTED_X, 2)
+        text = f"X:{x}"
+        put_label(overlay, text, (x+5, 50), 0.6, COLOR_EXPECTED_X, 2)
+        put_label(overlay, text, (x+5, height//2), 0.6, COLOR_EXPECTED_X, 2)
     
     # Draw EXPECTED checkbox Y positions (horizontal lines in magenta)
     expected_y = [1290, 1585, 1875, 2150, 2440]
     row_labels = ["R1", "R2", "R3", "R4", "R5"]
     for y, label in zip(expected_y, row_labels):
-        cv2.line(overlay, (0, y), (width, y), COLOR_EXPECTED_Y, 3)
+        cv2.line(overlay, (0, y), (width, y), COLOR_EXPECTED_Y, 3, cv2.LINE_4)
         # Label at multiple positions for visibility
-        cv2.putText(overlay, f"{label}:Y={y}", (50, y-10), 
-                   cv2.FONT_HERSHEY_SIMPLEX, 0.7, COLOR_EXPECTED_Y, 2)
-        cv2.putText(overlay, f"{label}:Y={y}", (width-200, y-10), 
-                   cv2.FONT_HERSHEY_SIMPLEX, 0.7, COLOR_EXPECTED_Y, 2)
+        text = f"{label}:Y={y}"
+        put_label(overlay, text, (50, y-10), 0.7, COLOR_EXPECTED_Y, 2)
+        put_label(overlay, text, (width-200, y-10), 0.7, COLOR_EXPECTED_Y, 2)
     
     # Draw EXPECTED checkbox boxes (120x110px) in green
     box_width = 120
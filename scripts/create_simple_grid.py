@@ -4,10 +4,18 @@ Create a simple grid overlay on the image with lines every 1000 pixels.
 Red for vertical lines, green for horizontal lines.
 """
 
-import cv2
-import numpy as np
 from pathlib import Path
 
+# cv2/numpy are imported inside the functions so a missing-image exit
+# does not pay their import cost
+
+
+def thick_line_band(positions, limit):
+    """Pixel columns/rows covered by 2px-thick cv2.line calls at positions (pos-1..pos+1)."""
+    import numpy as np
+    band = (positions[:, None] + np.arange(-1, 2)).ravel()
+    return np.unique(band[(band >= 0) & (band < limit)])
+
 
 def create_grid_overlay(image_path: Path, output_path: Path, grid_spacing_50: int = 50, grid_spacing_100: int = 100):
     """
@@ -19,6 +27,9 @@ def create_grid_overlay(image_path: Path, output_path: Path, grid_spacing_50: in
         grid_spacing_50: Spacing for thin lines (default: 50)
         grid_spacing_100: Spacing for thick red lines (default: 100)
     """
+    import cv2
+    import numpy as np
+    
     # Load image
     img = cv2.imread(str(image_path))
     if img is None:
@@ -30,49 +41,52 @@ def create_grid_overlay(image_path: Path, output_path: Path, grid_spacing_50: in
     # Create overlay
     overlay = img.copy()
     
+    # Grid lines are axis-aligned, so they are painted as whole columns/rows
+    # with slice assignment; thin lines go last as they did when drawn in order
+    xs = np.arange(0, width + 1, grid_spacing_50)
+    xs_thick, xs_thin = xs[xs % grid_spacing_100 == 0], xs[xs % grid_spacing_100 != 0]
+    ys = np.arange(0, height + 1, grid_spacing_50)
+    ys_thick, ys_thin = ys[ys % grid_spacing_100 == 0], ys[ys % grid_spacing_100 != 0]
+    
     # Draw vertical lines every 50px (thin green) and every 100px (thick red)
     print(f"\nDrawing vertical lines:")
-    for x in range(0, width + 1, grid_spacing_50):
-        if x % grid_spacing_100 == 0:
-            # Every 100px - thick RED line
-            cv2.line(overlay, (x, 0), (x, height), (0, 0, 255), 2)
-            print(f"  RED line at x={x}")
-            # Add label at top
-            label = f"{x}"
-            cv2.putText(
-                overlay,
-                label,
-                (x + 5, 30),
-                cv2.FONT_HERSHEY_SIMPLEX,
-                0.5,
-                (0, 0, 255),
-                2
-            )
-        else:
-            # Every 50px - thin GREEN line
-            cv2.line(overlay, (x, 0), (x, height), (0, 255, 0), 1)
+    overlay[:, thick_line_band(xs_thick, width)] = (0, 0, 255)
+    for x in xs_thick.tolist():
+        # Every 100px - thick RED line
+        print(f"  RED line at x={x}")
+        # Add label at top
+        label = str(x)
+        cv2.putText(
+            overlay,
+            label,
+            (x + 5, 30),
+            cv2.FONT_HERSHEY_SIMPLEX,
+            0.5,
+            (0, 0, 255),
+            2
+        )
+    # Every 50px - thin GREEN line
+    overlay[:, xs_thin[xs_thin < width]] = (0, 255, 0)
     
     # Draw horizontal lines every 50px (thin green) and every 100px (thick red)
     print(f"\nDrawing horizontal lines:")
-    for y in range(0, height + 1, grid_spacing_50):
-        if y % grid_spacing_100 == 0:
-            # Every 100px - thick RED line
-            cv2.line(overlay, (0, y), (width, y), (0, 0, 255), 2)
-            print(f"  RED line at y={y}")
-            # Add label at left
-            label = f"{y}"
-            cv2.putText(
-                overlay,
-                label,
-                (10, y + 25),
-                cv2.FONT_HERSHEY_SIMPLEX,
-                0.5,
-                (0, 0, 255),
-                2
-            )
-        else:
-            # Every 50px - thin GREEN line
-            cv2.line(overlay, (0, y), (width, y), (0, 255, 0), 1)
+    overlay[thick_line_band(ys_thick, height), :] = (0, 0, 255)
+    for y in ys_thick.tolist():
+        # Every 100px - thick RED line
+        print(f"  RED line at y={y}")
+        # Add label at left
+        label = str(y)
+        cv2.putText(
+            overlay,
+            label,
+            (10, y + 25),
+            cv2.FONT_HERSHEY_SIMPLEX,
+            0.5,
+            (0, 0, 255),
+            2
+        )
+    # Every 50px - thin GREEN line
+    overlay[ys_thin[ys_thin < height], :] = (0, 255, 0)
     
     # Add info box
     info_box_height = 120
@@ -4,37 +4,59 @@ Create multi-threshold visualization showing what different thresholds would det
 """
 import cv2
 import numpy as np
-import json
+import multiprocessing as mp
+import queue
+import sys
+import threading
+from functools import lru_cache
+from multiprocessing.util import Finalize
 from pathlib import Path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))  # repo root, so scripts.common imports without PYTHONPATH
+from scripts.common import load_template, otsu_fills, rois_as_array, njit
 
-def analyze_checkbox(img_gray, x, y, w, h):
-    """Extract and analyze a single checkbox"""
-    checkbox = img_gray[y:y+h, x:x+w]
-    _, binary = cv2.threshold(checkbox, 0, 255, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)
-    fill_pct = (np.sum(binary == 255) / binary.size) * 100
-    return fill_pct
+# Fill-percentage cutoffs; np.digitize maps a fill to a band index 0..4
+FILL_EDGES = [20, 30, 40, 55]
+BAND_COLORS = [(128, 128, 128), (0, 255, 0), (0, 255, 255), (0, 165, 255), (0, 0, 255)]
+BAND_LABELS = ["EMPTY (<20%)", "LOW (20-29%)", "MEDIUM (30-39%)", "HIGH (40-54%)", "CHECKED (≥55%)"]
+BAND_KEYS = ['empty', 'low_20', 'medium_30', 'high_40', 'checked_55']
 
-def get_color_for_threshold(fill_pct):
-    """Return color based on fill percentage thresholds"""
-    if fill_pct >= 55:
-        return (0, 0, 255), "CHECKED (≥55%)"  # Red - definitely checked
-    elif fill_pct >= 40:
-        return (0, 165, 255), "HIGH (40-54%)"  # Orange - likely checked
-    elif fill_pct >= 30:
-        return (0, 255, 255), "MEDIUM (30-39%)"  # Yellow - maybe marked
-    elif fill_pct >= 20:
-        return (0, 255, 0), "LOW (20-29%)"  # Green - light mark
-    else:
-        return (128, 128, 128), "EMPTY (<20%)"  # Gray - empty
+@lru_cache(maxsize=None)
+def fill_label_size(text):
+    """(width, height) of a fill-percent label; only ~100 distinct strings occur"""
+    return cv2.getTextSize(text, cv2.FONT_HERSHEY_SIMPLEX, 0.4, 1)[0]
+
+def rois_to_px(template, w, h):
+    """ROI ids and an (N, 4) int32 x, y, w, h table for a w x h page"""
+    roi_ids, norm = rois_as_array(template)
+    return roi_ids, (norm * (w, h, w, h)).astype(np.int32)
+
+def page_size(img_path):
+    """(h, w) of a page, read from the PNG header so the pixels are not decoded"""
+    with open(img_path, 'rb') as f:
+        head = f.read(24)
+    if head[:8] == b'\x89PNG\r\n\x1a\n' and head[12:16] == b'IHDR':
+        return int.from_bytes(head[20:24], 'big'), int.from_bytes(head[16:20], 'big')
+    return cv2.imread(str(img_path), cv2.IMREAD_GRAYSCALE).shape[:2]
+
+def create_threshold_visualization(img_path, roi_ids, rois_px, output_path):
+    """Create visualization with color-coded thresholds
 
-def create_threshold_visualization(img_path, template, output_path):
-    """Create visualization with color-coded thresholds"""
+    roi_ids/rois_px come from rois_to_px for the shared aligned page size.
+    Returns (success, stats); success is None while the PNG waits in this
+    worker's write queue.
+    """
     img = cv2.imread(str(img_path))
     if img is None:
         return False, None
     
     h, w = img.shape[:2]
-    overlay = img.copy()
+    
+    # Page overlay and legend are views into one output canvas
+    legend_height = 180
+    canvas = np.empty((h + legend_height, w, 3), dtype=np.uint8)
+    overlay = canvas[:h]
+    overlay[...] = img
+    img_gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
     
     stats = {
         'checked_55': 0,
@@ -45,42 +67,31 @@ def create_threshold_visualization(img_path, template, output_path):
         'fills': []
     }
     
-    # Analyze and draw all checkboxes
-    for roi in template['checkbox_rois_norm']:
-        x = int(roi['x'] * w)
-        y = int(roi['y'] * h)
-        roi_w = int(roi['w'] * w)
-        roi_h = int(roi['h'] * h)
-        
-        if x < 0 or y < 0 or x+roi_w > w or y+roi_h > h:
-            continue
-        
-        # Get fill percentage
-        img_gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-        fill_pct = analyze_checkbox(img_gray, x, y, roi_w, roi_h)
-        stats['fills'].append(fill_pct)
-        
-        # Get color based on threshold
-        color, label = get_color_for_threshold(fill_pct)
-        
-        # Update stats
-        if fill_pct >= 55:
-            stats['checked_55'] += 1
-        elif fill_pct >= 40:
-            stats['high_40'] += 1
-        elif fill_pct >= 30:
-            stats['medium_30'] += 1
-        elif fill_pct >= 20:
-            stats['low_20'] += 1
-        else:
-            stats['empty'] += 1
+    # Only ROIs inside the page
+    xs, ys, ws, hs = rois_px.T
+    inside = (xs >= 0) & (ys >= 0) & (xs + ws <= w) & (ys + hs <= h)
+    roi_ids = [r for r, ok in zip(roi_ids, inside) if ok]
+    rois_px = rois_px[inside]
+    
+    # Get fill percentages
+    fills, _ = otsu_fills(img_gray, rois_px)
+    
+    # Classify every ROI into its fill band at once
+    bands = np.digitize(fills, FILL_EDGES)
+    stats.update(zip(BAND_KEYS, np.bincount(bands, minlength=len(BAND_KEYS)).tolist()))
+    stats['fills'] = fills.tolist()
+    
+    # Draw all checkboxes
+    for roi_id, (x, y, roi_w, roi_h), fill_pct, band in zip(roi_ids, rois_px.tolist(),
+                                                           stats['fills'], bands.tolist()):
+        color = BAND_COLORS[band]
         
         # Draw rectangle with appropriate color
         cv2.rectangle(overlay, (x, y), (x+roi_w, y+roi_h), color, 3)
         
         # Add fill percentage text
         text = f"{fill_pct:.0f}%"
-        text_size = cv2.getTextSize(text, cv2.FONT_HERSHEY_SIMPLEX, 0.4, 1)[0]
+        text_size = fill_label_size(text)
         text_x = x + (roi_w - text_size[0]) // 2
         text_y = y + (roi_h + text_size[1]) // 2
         
@@ -91,12 +102,12 @@ def create_threshold_visualization(img_path, template, output_path):
                    cv2.FONT_HERSHEY_SIMPLEX, 0.4, (0, 0, 0), 1)
         
         # Add checkbox ID above
-        cv2.putText(overlay, roi['id'], (x, y-5),
+        cv2.putText(overlay, roi_id, (x, y-5),
                    cv2.FONT_HERSHEY_SIMPLEX, 0.4, color, 1)
     
     # Create legend
-    legend_height = 180
-    legend = np.ones((legend_height, w, 3), dtype=np.uint8) * 255
+    legend = canvas[h:]
+    legend[...] = 255
     
     y_pos = 30
     legend_items = [
@@ -123,24 +134,80 @@ def create_threshold_visualization(img_path, template, output_path):
         cv2.putText(legend, f"Average fill: {avg_fill:.1f}%  |  Max fill: {max_fill:.1f}%", 
                    (20, y_pos+10), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 0, 255), 2)
     
-    # Combine image and legend
-    result = np.vstack([overlay, legend])
+    # Off-load PNG compression so the next page's analysis can start; the
+    # outcome is not known yet, so success is None (pending) in that case
+    if _write_queue is not None:
+        _write_queue.put((output_path, canvas))
+        return None, stats
+    return cv2.imwrite(str(output_path), canvas), stats
+
+_write_queue = None  # per-worker (path, image) queue drained by _png_writer
+
+def _png_writer(q, failed):
+    """Encode and write queued images until the None sentinel arrives
+
+    Errors never stop the thread (the worker would block on a full queue);
+    each failed path is logged and appended to the shared failed list.
+    """
+    while True:
+        item = q.get()
+        if item is None:
+            break
+        path, img = item
+        try:
+            ok, buf = cv2.imencode('.png', img)
+            if not ok:
+                raise ValueError("PNG encoding failed")
+            buf.tofile(str(path))
+        except Exception as e:
+            print(f"❌ Could not write {path}: {e}")
+            failed.append(str(path))
+
+def _init_writer(failed):
+    """Pool initializer: pin numba to one thread and start this worker's background PNG writer
+
+    The pool already runs one worker per core, so a parallel fill_percentages
+    call must not start another cpu_count() threads in every worker.
+    The Finalize hook queues the sentinel and joins the thread when the worker
+    exits cleanly (pool.close() + pool.join()), so no pending page is lost.
+    Paths that could not be written are reported through failed (a Manager list).
+    """
+    global _write_queue
+    if njit is not None:
+        import numba
+        numba.set_num_threads(1)
+    _write_queue = queue.Queue(maxsize=2)
+    writer = threading.Thread(target=_png_writer, args=(_write_queue, failed))
+    writer.start()
     
-    cv2.imwrite(str(output_path), result)
-    return True, stats
+    def _stop():
+        _write_queue.put(None)
+        writer.join()
+    Finalize(None, _stop, exitpriority=10)
+
+def _process_page(args):
+    """Pool worker: render one page and return (page_num, success, stats)"""
+    img_path, roi_ids, rois_px, output_dir = args
+    page_num = img_path.stem.split('_')[1]
+    output_path = output_dir / f"page_{page_num}_thresholds.png"
+    success, stats = create_threshold_visualization(img_path, roi_ids, rois_px, output_path)
+    return page_num, success, stats
 
 def main():
     run_dir = Path("artifacts/run_20251001_185300")
     
     # Load template
-    template_path = Path("templates/crc_survey_l_anchors_v1/template.json")
-    with open(template_path) as f:
-        template = json.load(f)
+    template = load_template("templates/crc_survey_l_anchors_v1/template.json")
     
     # Find aligned cropped images
     aligned_dir = run_dir / "02_step2_alignment_and_crop/aligned_cropped"
     image_files = sorted(aligned_dir.glob("page_*.png"))
     
+    # Aligned pages share one size, so the ROI pixel table is built once
+    if image_files:
+        ref_h, ref_w = page_size(image_files[0])
+        roi_ids, rois_px = rois_to_px(template, ref_w, ref_h)
+    
     print(f"Creating threshold visualizations for {len(image_files)} pages...")
     print("\nColor Legend:")
     print("  🔴 RED (≥55%):    CHECKED - Current threshold")
@@ -163,14 +230,27 @@ def main():
         'empty': 0
     }
     
+    # Pages are independent, so render them across all cores
+    args_list = [(img_path, roi_ids, rois_px, output_dir) for img_path in image_files]
+    with mp.Manager() as manager:
+        failed = manager.list()
+        pool = mp.Pool(initializer=_init_writer, initargs=(failed,))
+        try:
+            results = list(pool.imap_unordered(_process_page, args_list))
+        finally:
+            # close/join (not terminate) so each worker flushes its PNG writer
+            pool.close()
+            pool.join()
+        failed = set(failed)
+    # Queued pages (success None) only count once their PNG is on disk
+    results.sort(key=lambda r: r[0])
+    results = [(page_num, success if success is not None
+                else str(output_dir / f"page_{page_num}_thresholds.png") not in failed, stats)
+               for page_num, success, stats in results]
+    
     success_count = 0
-    for img_path in image_files:
-        page_num = img_path.stem.split('_')[1]
-        output_path = output_dir / f"page_{page_num}_thresholds.png"
-        
+    for page_num, success, stats in results:
         print(f"Processing page {page_num}...", end=" ")
-        success, stats = create_threshold_visualization(img_path, template, output_path)
-        
         if success:
             print(f"✅ Saved - R:{stats['checked_55']} O:{stats['high_40']} "
                   f"Y:{stats['medium_30']} G:{stats['low_20']} Gray:{stats['empty']}")
@@ -4,9 +4,10 @@ Debug checkbox detection by extracting ROIs and showing their contents
 """
 import cv2
 import numpy as np
-import json
 import sys
 from pathlib import Path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))  # repo root, so scripts.common imports without PYTHONPATH
+from scripts.common import imread_gray, load_template, otsu_fills, rois_as_array
 
 def main():
     if len(sys.argv) < 2:
@@ -21,19 +22,19 @@ def main():
         print(f"Error: Image not found at {img_path}")
         sys.exit(1)
     
-    img = cv2.imread(str(img_path))
-    if img is None:
+    # Analysis only needs luminance; the colour page is read again for the composite
+    img_gray = imread_gray(img_path)
+    if img_gray is None:
         print(f"Error: Could not load image from {img_path}")
         sys.exit(1)
     
-    img_gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
     h, w = img_gray.shape
     print(f"Image dimensions: {w}×{h}")
     
     # Load template
-    template_path = Path("templates/crc_survey_l_anchors_v1/template.json")
-    with open(template_path) as f:
-        template = json.load(f)
+    template = load_template("templates/crc_survey_l_anchors_v1/template.json")
+    all_ids, all_norm = rois_as_array(template)
+    all_px = (all_norm * (w, h, w, h)).astype(int)
     
     # Create output directory
     debug_dir = run_dir / "debug_checkboxes"
@@ -41,29 +42,37 @@ def main():
     
     print(f"\nExtracting first 5 checkboxes from Q1:")
     
-    for i, roi in enumerate(template['checkbox_rois_norm'][:5]):
-        roi_id = roi['id']
-        
-        # Convert normalized coords to pixels
-        x = int(roi['x'] * w)
-        y = int(roi['y'] * h)
-        roi_w = int(roi['w'] * w)
-        roi_h = int(roi['h'] * h)
+    # Convert normalized coords to pixels
+    roi_ids, rois_norm, rois_px = all_ids[:5], all_norm[:5], all_px[:5]
+    xs, ys, ws, hs = rois_px.T
+    inside = (xs >= 0) & (ys >= 0) & (xs + ws <= w) & (ys + hs <= h)
+    
+    # Calculate fill percentages for all in-bounds ROIs in one batch
+    fills = np.zeros(len(roi_ids))
+    thresholds = np.zeros(len(roi_ids))
+    fills[inside], thresholds[inside] = otsu_fills(img_gray, rois_px[inside])
+    
+    vis = None  # side-by-side scratch buffer, reused while ROI size is unchanged
+    binary_buf = np.empty((max(hs.max(initial=0), 1), max(ws.max(initial=0), 1)), dtype=np.uint8)
+    
+    for i, roi_id in enumerate(roi_ids):
+        nx, ny, nw, nh = rois_norm[i].tolist()
+        x, y, roi_w, roi_h = rois_px[i].tolist()
         
         print(f"\n{roi_id}:")
-        print(f"  Normalized: x={roi['x']:.4f}, y={roi['y']:.4f}, w={roi['w']:.4f}, h={roi['h']:.4f}")
+        print(f"  Normalized: x={nx:.4f}, y={ny:.4f}, w={nw:.4f}, h={nh:.4f}")
         print(f"  Pixels: x={x}, y={y}, w={roi_w}, h={roi_h}")
         
         # Extract ROI
-        if x < 0 or y < 0 or x+roi_w > w or y+roi_h > h:
+        if not inside[i]:
             print(f"  ⚠️  WARNING: ROI extends outside image bounds!")
             continue
         
         checkbox = img_gray[y:y+roi_h, x:x+roi_w]
         
-        # Calculate fill percentage
-        _, binary = cv2.threshold(checkbox, 0, 255, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)
-        fill_pct = (np.sum(binary == 255) / binary.size) * 100
+        fill_pct = fills[i]
+        binary = binary_buf[:roi_h, :roi_w]
+        cv2.threshold(checkbox, thresholds[i], 255, cv2.THRESH_BINARY_INV, dst=binary)
         
         # Stats
         mean_val = np.mean(checkbox)
@@ -78,10 +87,10 @@ def main():
         output_path = debug_dir / f"{roi_id}_fill{fill_pct:.0f}pct.png"
         
         # Create a visualization with the checkbox and its binary version
-        vis = np.hstack([
-            cv2.cvtColor(checkbox, cv2.COLOR_GRAY2BGR),
-            cv2.cvtColor(binary, cv2.COLOR_GRAY2BGR)
-        ])
+        if vis is None or vis.shape[:2] != (roi_h, 2 * roi_w):
+            vis = np.empty((roi_h, 2 * roi_w, 3), dtype=np.uint8)
+        cv2.cvtColor(checkbox, cv2.COLOR_GRAY2BGR, dst=vis[:, :roi_w])
+        cv2.cvtColor(binary, cv2.COLOR_GRAY2BGR, dst=vis[:, roi_w:])
         
         # Add text
         cv2.putText(vis, f"{fill_pct:.1f}%", (5, 15), 
@@ -92,19 +101,14 @@ def main():
     
     # Create a composite image showing all ROIs with their positions
     print(f"\n\nCreating composite visualization...")
-    composite = img.copy()
+    composite = cv2.imread(str(img_path))
     
-    for roi in template['checkbox_rois_norm']:
-        x = int(roi['x'] * w)
-        y = int(roi['y'] * h)
-        roi_w = int(roi['w'] * w)
-        roi_h = int(roi['h'] * h)
-        
+    for roi_id, (x, y, roi_w, roi_h) in zip(all_ids, all_px.tolist()):
         # Draw rectangle
         cv2.rectangle(composite, (x, y), (x+roi_w, y+roi_h), (0, 255, 0), 2)
         
         # Add label
-        cv2.putText(composite, roi['id'], (x, y-5),
+        cv2.putText(composite, roi_id, (x, y-5),
                    cv2.FONT_HERSHEY_SIMPLEX, 0.4, (0, 255, 0), 1)
     
     composite_path = debug_dir / "all_rois_on_image.png"
@@ -17,13 +17,24 @@ Examples:
     python scripts/export_to_excel.py artifacts/run_20251001_185300 11.5
 """
 
+import os
 import sys
+import csv
 import json
 import argparse
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache, partial
 from pathlib import Path
 import cv2
 import numpy as np
 from datetime import datetime
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))  # repo root, so scripts.common imports without PYTHONPATH
+from scripts.common import imread_gray, rois_as_array
+
+try:
+    from numba import njit  # optional: compiles the per-page ROI sweep
+except ImportError:
+    njit = None
 
 try:
     import openpyxl
@@ -31,85 +42,120 @@ try:
     from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
     from openpyxl.utils import get_column_letter
     from openpyxl.chart import BarChart, Reference
+    from openpyxl.cell import WriteOnlyCell
 except ImportError:
     print("ERROR: openpyxl not installed")
     print("Install with: pip install openpyxl")
     sys.exit(1)
 
+# Shared cell styles; write-only cells are styled one by one, so build each once
+TITLE_FONT = Font(bold=True, size=14)
+BOLD_FONT = Font(bold=True)
+ITALIC_FONT = Font(italic=True)
+NOTE_FONT = Font(italic=True, size=10)
+HEADER_FONT = Font(bold=True, color="FFFFFF")
+HEADER_FILL = PatternFill(start_color="366092", end_color="366092", fill_type="solid")
+GRADING_FILL = PatternFill(start_color="FFC000", end_color="FFC000", fill_type="solid")
+CHECKED_FONT = Font(color="006100", bold=True)
+CHECKED_FILL = PatternFill(start_color="C6EFCE", end_color="C6EFCE", fill_type="solid")
+REVIEW_FILL = PatternFill(start_color="FFEB9C", end_color="FFEB9C", fill_type="solid")
+TOTAL_FILL = PatternFill(start_color="D9E1F2", end_color="D9E1F2", fill_type="solid")
+CENTER = Alignment(horizontal='center')
+
 
 def load_template():
     """Load the template configuration."""
     template_path = Path("templates/crc_survey_l_anchors_v1/template.json")
     with open(template_path, 'r') as f:
-        return json.load(f)
+        template = json.load(f)
+    return template
 
 
-def detect_checkbox_fill(roi_img):
-    """
-    Detect if a checkbox is filled using Otsu thresholding.
-    Returns the percentage of dark pixels.
-    """
-    # Convert to grayscale if needed
-    if len(roi_img.shape) == 3:
-        gray = cv2.cvtColor(roi_img, cv2.COLOR_BGR2GRAY)
-    else:
-        gray = roi_img
-    
-    # Apply Otsu thresholding
-    _, binary = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)
-    
-    # Calculate fill percentage
-    total_pixels = binary.size
-    dark_pixels = np.sum(binary > 0)
-    fill_percent = (dark_pixels / total_pixels) * 100
-    
-    return fill_percent
+if njit is not None:
+    @njit(cache=True)
+    def sweep_rois(sat, boxes, edges):
+        """
+        Fill percentage and band of each (x0, y0, x1, y1) box from a 0/1 summed-area table.
+        The band is the number of edges <= fill (np.digitize); empty boxes get band -1.
+        """
+        n = boxes.shape[0]
+        fills = np.zeros(n)
+        bands = np.full(n, -1, np.int64)
+        for i in range(n):
+            x0, y0, x1, y1 = boxes[i, 0], boxes[i, 1], boxes[i, 2], boxes[i, 3]
+            area = max(x1 - x0, 0) * max(y1 - y0, 0)
+            if area == 0:
+                continue
+            dark = sat[y1, x1] - sat[y0, x1] - sat[y1, x0] + sat[y0, x0]
+            fill = dark / area * 100
+            band = 0
+            for edge in edges:
+                if fill >= edge:
+                    band += 1
+            fills[i] = fill
+            bands[i] = band
+        return fills, bands
+else:
+    def sweep_rois(sat, boxes, edges):
+        """
+        Fill percentage and band of each (x0, y0, x1, y1) box from a 0/1 summed-area table.
+        The band is the number of edges <= fill (np.digitize); empty boxes get band -1.
+        """
+        x0, y0, x1, y1 = boxes.T
+        area = np.maximum(x1 - x0, 0) * np.maximum(y1 - y0, 0)
+        dark = sat[y1, x1] - sat[y0, x1] - sat[y1, x0] + sat[y0, x0]
+        fills = np.where(area > 0, dark / np.maximum(area, 1) * 100, 0.0)
+        bands = np.where(area > 0, np.digitize(fills, edges), -1)
+        return fills, bands
 
 
-def process_page(page_path, template, threshold):
+def process_page(page_path, roi_ids, rois_norm, threshold, scale=1.0):
     """
     Process a single page and detect filled checkboxes.
     Returns dict with checkbox IDs and their fill percentages.
+    roi_ids/rois_norm are the template ROIs from common.rois_as_array.
+    
+    The page is Otsu-thresholded once and reduced to a summed-area table,
+    so each checkbox's dark-pixel count is four table lookups. A scale
+    below 1.0 area-averages the page down first (0.25 ~ 75 DPI for a
+    300 DPI scan); ROIs are normalized, so they need no adjustment.
     """
-    # Load the cropped/aligned image
-    img = cv2.imread(str(page_path))
-    if img is None:
+    # Load the cropped/aligned image; detection only needs luminance
+    gray = imread_gray(page_path)
+    if gray is None:
         return None
     
-    results = {}
+    if scale < 1.0:
+        gray = cv2.resize(gray, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
     
-    # Process each checkbox
-    for roi in template['checkbox_rois_norm']:
-        checkbox_id = roi['id']
-        
-        # Convert normalized coordinates to pixels
-        h, w = img.shape[:2]
-        x = int(roi['x'] * w)
-        y = int(roi['y'] * h)
-        box_w = int(roi['w'] * w)
-        box_h = int(roi['h'] * h)
-        
-        # Extract ROI
-        roi_img = img[y:y+box_h, x:x+box_w]
-        
-        if roi_img.size == 0:
-            continue
-        
-        # Detect fill percentage
-        fill_percent = detect_checkbox_fill(roi_img)
-        
-        # Determine if checked
-        is_checked = fill_percent >= threshold
-        
-        results[checkbox_id] = {
-            'fill_percent': round(fill_percent, 2),
-            'checked': is_checked
-        }
+    h, w = gray.shape
+    
+    # 0/1 dark mask (maxval 1), so integral sums are pixel counts
+    _, dark = cv2.threshold(gray, 0, 1, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)
+    sat = cv2.integral(dark, sdepth=cv2.CV_32S)
+    
+    # Convert normalized coordinates to pixels, clipped to the page like a slice
+    xs, ys, box_ws, box_hs = (rois_norm * (w, h, w, h)).astype(np.int32).T
+    boxes = np.stack([np.clip(xs, 0, w), np.clip(ys, 0, h),
+                      np.clip(xs + box_ws, 0, w), np.clip(ys + box_hs, 0, h)], axis=1)
+    
+    # Band 1 is "checked"; band -1 marks boxes entirely off the page
+    fill_percents, bands = sweep_rois(sat, boxes, np.array([threshold], dtype=np.float64))
     
-    return results
+    return {
+        checkbox_id: {'fill_percent': round(fill_percent, 2), 'checked': band == 1}
+        for checkbox_id, fill_percent, band in zip(roi_ids, fill_percents.tolist(), bands.tolist())
+        if band >= 0
+    }
 
 
-def create_excel_report(run_folder, threshold, output_path=None):
+def _process_page_worker(page_path, roi_ids, rois_norm, threshold, scale=1.0):
+    """ProcessPoolExecutor task: (page_num, process_page results) for one page."""
+    page_num = int(page_path.stem.split('_')[1])
+    return page_num, process_page(page_path, roi_ids, rois_norm, threshold, scale)
+
+
+def create_excel_report(run_folder, threshold, output_path=None, scale=1.0):
     """Create comprehensive Excel report of checkbox detection results."""
     
     run_path = Path(run_folder)
@@ -122,6 +168,7 @@ def create_excel_report(run_folder, threshold, output_path=None):
     # Load template
     print("Loading template...")
     template = load_template()
+    roi_ids, rois_norm = rois_as_array(template)
     
     # Get detection settings from template
     if 'detection_settings' in template:
@@ -130,18 +177,21 @@ def create_excel_report(run_folder, threshold, output_path=None):
             threshold = template_threshold
     
     print(f"Using threshold: {threshold}%")
+    if scale < 1.0:
+        print(f"Detection scale: {scale:g}x")
     
     # Find all aligned pages
     pages = sorted(aligned_dir.glob("page_*.png"))
     print(f"Found {len(pages)} pages to process")
     
-    # Process all pages
+    # Process all pages; they are independent, so spread them over all cores
     all_results = {}
-    for page_path in pages:
-        page_num = page_path.stem.split('_')[1]
-        print(f"Processing page {page_num}...", end=' ')
+    with ProcessPoolExecutor(max_workers=os.cpu_count()) as ex:
+        page_results = list(ex.map(partial(_process_page_worker, roi_ids=roi_ids, rois_norm=rois_norm, threshold=threshold, scale=scale), pages, chunksize=4))
+    
+    for page_num, results in page_results:
+        print(f"Processing page {page_num:04d}...", end=' ')
         
-        results = process_page(page_path, template, threshold)
         if results:
             all_results[page_num] = results
             checked_count = sum(1 for r in results.values() if r['checked'])
@@ -155,18 +205,16 @@ def create_excel_report(run_folder, threshold, output_path=None):
     
     # Create Excel workbook
     print("\nCreating Excel workbook...")
-    wb = Workbook()
-    
-    # Remove default sheet
-    if 'Sheet' in wb.sheetnames:
-        wb.remove(wb['Sheet'])
+    # Write-only: rows are streamed with ws.append instead of cell-by-cell
+    wb = Workbook(write_only=True)
     
     # Create sheets
     create_summary_sheet(wb, all_results, threshold)
     create_detailed_sheet(wb, all_results, threshold)  # Simple 6-column version (like run export)
     create_detailed_with_grading_sheet(wb, all_results, threshold)  # 11-column version with grading
     create_tally_sheet(wb, all_results)
-    create_raw_data_sheet(wb, all_results)
+    raw_rows = raw_data_rows(all_results)
+    create_raw_data_sheet(wb, raw_rows)
     
     # Save workbook
     if output_path:
@@ -178,27 +226,43 @@ def create_excel_report(run_folder, threshold, output_path=None):
     wb.save(output_file)
     print(f"\n✅ Excel report saved: {output_file}")
     
+    if len(raw_rows) > RAW_CSV_MIN_ROWS:
+        csv_file = output_file.parent / "raw_data.csv"
+        write_raw_data_csv(csv_file, raw_rows)
+        print(f"✅ Raw data CSV saved: {csv_file} ({len(raw_rows):,} rows)")
+    
     return output_file
 
 
+def styled_cell(ws, value, font=None, fill=None, alignment=None):
+    """WriteOnlyCell for ws carrying the given (shared) styles."""
+    cell = WriteOnlyCell(ws, value=value)
+    if font is not None:
+        cell.font = font
+    if fill is not None:
+        cell.fill = fill
+    if alignment is not None:
+        cell.alignment = alignment
+    return cell
+
+
+def set_column_widths(ws, widths):
+    """Set column widths; write-only sheets need this before the first row is appended."""
+    for col, width in enumerate(widths, start=1):
+        ws.column_dimensions[get_column_letter(col)].width = width
+
+
+@lru_cache(maxsize=None)
+def parse_checkbox_id(checkbox_id):
+    """Row and column numbers from an ID like Q1_1 (already 1-based)."""
+    parts = checkbox_id.split('_')
+    return int(parts[0][1:]), int(parts[1])
+
+
 def create_summary_sheet(wb, all_results, threshold):
     """Create summary sheet with overview statistics."""
     ws = wb.create_sheet("Summary", 0)
-    
-    # Title
-    ws['A1'] = "CRC Survey - Checkbox Detection Summary"
-    ws['A1'].font = Font(bold=True, size=14)
-    ws.merge_cells('A1:F1')
-    
-    # Metadata
-    ws['A3'] = "Detection Settings"
-    ws['A3'].font = Font(bold=True)
-    ws['A4'] = "Threshold:"
-    ws['B4'] = f"{threshold}%"
-    ws['A5'] = "Method:"
-    ws['B5'] = "Otsu Thresholding"
-    ws['A6'] = "Total Pages:"
-    ws['B6'] = len(all_results)
+    set_column_widths(ws, [20, 15, 12, 12, 12])
     
     # Calculate statistics
     total_checkboxes = 0
@@ -208,128 +272,88 @@ def create_summary_sheet(wb, all_results, threshold):
         total_checkboxes += len(page_results)
         total_checked += sum(1 for r in page_results.values() if r['checked'])
     
-    ws['A8'] = "Overall Statistics"
-    ws['A8'].font = Font(bold=True)
-    ws['A9'] = "Total Checkboxes:"
-    ws['B9'] = total_checkboxes
-    ws['A10'] = "Total Checked:"
-    ws['B10'] = total_checked
-    ws['A11'] = "Total Unchecked:"
-    ws['B11'] = total_checkboxes - total_checked
-    ws['A12'] = "Checked Percentage:"
-    ws['B12'] = f"{(total_checked/total_checkboxes*100):.1f}%"
+    # Title
+    ws.append([styled_cell(ws, "CRC Survey - Checkbox Detection Summary", font=TITLE_FONT)])
+    ws.merged_cells.add('A1:F1')
+    ws.append([])
+    
+    # Metadata
+    ws.append([styled_cell(ws, "Detection Settings", font=BOLD_FONT)])
+    ws.append(["Threshold:", f"{threshold}%"])
+    ws.append(["Method:", "Otsu Thresholding"])
+    ws.append(["Total Pages:", len(all_results)])
+    ws.append([])
+    
+    ws.append([styled_cell(ws, "Overall Statistics", font=BOLD_FONT)])
+    ws.append(["Total Checkboxes:", total_checkboxes])
+    ws.append(["Total Checked:", total_checked])
+    ws.append(["Total Unchecked:", total_checkboxes - total_checked])
+    ws.append(["Checked Percentage:", f"{(total_checked/total_checkboxes*100):.1f}%"])
+    ws.append([])
     
     # Per-page summary
-    ws['A14'] = "Per-Page Summary"
-    ws['A14'].font = Font(bold=True)
+    ws.append([styled_cell(ws, "Per-Page Summary", font=BOLD_FONT)])
     
     headers = ['Page', 'Total Boxes', 'Checked', 'Unchecked', 'Check Rate']
-    for col, header in enumerate(headers, start=1):
-        cell = ws.cell(row=15, column=col)
-        cell.value = header
-        cell.font = Font(bold=True)
-        cell.fill = PatternFill(start_color="366092", end_color="366092", fill_type="solid")
-        cell.font = Font(bold=True, color="FFFFFF")
-    
-    row = 16
-    for page_num in sorted(all_results.keys()):
+    ws.append([styled_cell(ws, header, font=HEADER_FONT, fill=HEADER_FILL) for header in headers])
+    
+    for page_num in sorted(all_results):
         results = all_results[page_num]
         checked = sum(1 for r in results.values() if r['checked'])
         total = len(results)
         
-        ws.cell(row=row, column=1, value=f"Page {page_num}")
-        ws.cell(row=row, column=2, value=total)
-        ws.cell(row=row, column=3, value=checked)
-        ws.cell(row=row, column=4, value=total - checked)
-        ws.cell(row=row, column=5, value=f"{(checked/total*100):.1f}%")
-        row += 1
-    
-    # Adjust column widths
-    ws.column_dimensions['A'].width = 20
-    ws.column_dimensions['B'].width = 15
-    ws.column_dimensions['C'].width = 12
-    ws.column_dimensions['D'].width = 12
-    ws.column_dimensions['E'].width = 12
+        ws.append([f"Page {page_num:04d}", total, checked, total - checked, f"{(checked/total*100):.1f}%"])
 
 
 def create_detailed_sheet(wb, all_results, threshold):
     """Create simple detailed sheet (6 columns) - easier to scan, like run export."""
     ws = wb.create_sheet("Detailed Results")
+    set_column_widths(ws, [12, 15, 8, 10, 10, 12])
     
     # Title
-    ws['A1'] = "Detailed Checkbox Results by Page"
-    ws['A1'].font = Font(bold=True, size=14)
-    ws.merge_cells('A1:F1')
+    ws.append([styled_cell(ws, "Detailed Checkbox Results by Page", font=TITLE_FONT)])
+    ws.merged_cells.add('A1:F1')
+    ws.append([])
     
     # Headers
     headers = ['Page', 'Checkbox ID', 'Row', 'Column', 'Fill %', 'Status']
-    for col, header in enumerate(headers, start=1):
-        cell = ws.cell(row=3, column=col)
-        cell.value = header
-        cell.font = Font(bold=True)
-        cell.fill = PatternFill(start_color="366092", end_color="366092", fill_type="solid")
-        cell.font = Font(bold=True, color="FFFFFF")
-        cell.alignment = Alignment(horizontal='center')
-    
-    row = 4
-    for page_num in sorted(all_results.keys()):
+    ws.append([styled_cell(ws, header, font=HEADER_FONT, fill=HEADER_FILL, alignment=CENTER)
+               for header in headers])
+    
+    for page_num in sorted(all_results):
         results = all_results[page_num]
         
         for checkbox_id in sorted(results.keys()):
             data = results[checkbox_id]
-            
-            # Parse row and column from ID (Q1_1 -> Row 1, Col 1)
-            parts = checkbox_id.split('_')
-            q_row = parts[0][1:]  # Remove 'Q'
-            q_col = int(parts[1])  # Already 1-based
-            
-            ws.cell(row=row, column=1, value=f"Page {page_num}")
-            ws.cell(row=row, column=2, value=checkbox_id)
-            ws.cell(row=row, column=3, value=int(q_row))
-            ws.cell(row=row, column=4, value=q_col)
-            ws.cell(row=row, column=5, value=data['fill_percent'])
-            ws.cell(row=row, column=6, value="Checked" if data['checked'] else "Empty")
+            q_row, q_col = parse_checkbox_id(checkbox_id)
             
             # Color code status
-            status_cell = ws.cell(row=row, column=6)
             if data['checked']:
-                status_cell.fill = PatternFill(start_color="C6EFCE", end_color="C6EFCE", fill_type="solid")
-                status_cell.font = Font(color="006100", bold=True)
+                status = styled_cell(ws, "Checked", font=CHECKED_FONT, fill=CHECKED_FILL)
+            else:
+                status = "Empty"
             
-            row += 1
-    
-    # Adjust column widths
-    ws.column_dimensions['A'].width = 12
-    ws.column_dimensions['B'].width = 15
-    ws.column_dimensions['C'].width = 8
-    ws.column_dimensions['D'].width = 10
-    ws.column_dimensions['E'].width = 10
-    ws.column_dimensions['F'].width = 12
+            ws.append([f"Page {page_num:04d}", checkbox_id, q_row, q_col, data['fill_percent'], status])
 
 
 def create_detailed_with_grading_sheet(wb, all_results, threshold):
     """Create detailed sheet with all checkbox data and manual grading columns (11 columns)."""
     ws = wb.create_sheet("Detailed Results + Grading")
+    set_column_widths(ws, [12, 15, 8, 10, 10, 12, 15, 15, 15, 15, 30])
     
     # Title
-    ws['A1'] = "Detailed Checkbox Results by Page - With Manual Review Columns"
-    ws['A1'].font = Font(bold=True, size=14)
-    ws.merge_cells('A1:K1')
+    ws.append([styled_cell(ws, "Detailed Checkbox Results by Page - With Manual Review Columns",
+                           font=TITLE_FONT)])
+    ws.merged_cells.add('A1:K1')
     
     # Instructions
-    ws['A2'] = "Use columns G-K to record manual review decisions. OCR results are in columns A-F."
-    ws['A2'].font = Font(italic=True, size=10)
-    ws.merge_cells('A2:K2')
+    ws.append([styled_cell(ws, "Use columns G-K to record manual review decisions. OCR results are in columns A-F.",
+                           font=NOTE_FONT)])
+    ws.merged_cells.add('A2:K2')
+    ws.append([])
     
     # Headers - OCR Results
     headers = ['Page', 'Checkbox ID', 'Row', 'Column', 'Fill %', 'OCR Status']
-    for col, header in enumerate(headers, start=1):
-        cell = ws.cell(row=4, column=col)
-        cell.value = header
-        cell.font = Font(bold=True)
-        cell.fill = PatternFill(start_color="366092", end_color="366092", fill_type="solid")
-        cell.font = Font(bold=True, color="FFFFFF")
-        cell.alignment = Alignment(horizontal='center')
     
     # Headers - Manual Grading Columns
     grading_headers = [
@@ -339,59 +363,34 @@ def create_detailed_with_grading_sheet(wb, all_results, threshold):
         'Reviewer',            # J - Name/initials
         'Notes'                # K - Any comments
     ]
-    for idx, header in enumerate(grading_headers, start=7):
-        cell = ws.cell(row=4, column=idx)
-        cell.value = header
-        cell.font = Font(bold=True)
-        cell.fill = PatternFill(start_color="FFC000", end_color="FFC000", fill_type="solid")  # Orange for manual columns
-        cell.font = Font(bold=True, color="FFFFFF")
-        cell.alignment = Alignment(horizontal='center')
+    ws.append([styled_cell(ws, header, font=HEADER_FONT, fill=HEADER_FILL, alignment=CENTER)
+               for header in headers] +
+              [styled_cell(ws, header, font=HEADER_FONT, fill=GRADING_FILL, alignment=CENTER)  # Orange for manual columns
+               for header in grading_headers])
     
     row = 5
-    for page_num in sorted(all_results.keys()):
+    for page_num in sorted(all_results):
         results = all_results[page_num]
         
         for checkbox_id in sorted(results.keys()):
             data = results[checkbox_id]
-            
-            # Parse row and column from ID (Q1_1 -> Row 1, Col 1)
-            parts = checkbox_id.split('_')
-            q_row = parts[0][1:]  # Remove 'Q'
-            q_col = int(parts[1])  # Already 1-based
-            
-            # OCR Results (columns A-F)
-            ws.cell(row=row, column=1, value=f"Page {page_num}")
-            ws.cell(row=row, column=2, value=checkbox_id)
-            ws.cell(row=row, column=3, value=int(q_row))
-            ws.cell(row=row, column=4, value=q_col)
-            ws.cell(row=row, column=5, value=f"{data['fill_percent']:.1f}%")
-            ws.cell(row=row, column=6, value="✓ Checked" if data['checked'] else "Empty")
+            q_row, q_col = parse_checkbox_id(checkbox_id)
             
             # Color code OCR status
-            status_cell = ws.cell(row=row, column=6)
             if data['checked']:
-                status_cell.fill = PatternFill(start_color="C6EFCE", end_color="C6EFCE", fill_type="solid")
-                status_cell.font = Font(color="006100", bold=True)
+                status = styled_cell(ws, "✓ Checked", font=CHECKED_FONT, fill=CHECKED_FILL)
+            else:
+                status = "Empty"
             
-            # Manual Grading Columns (G-K) - Leave empty for user to fill
             # G - Manual Review? (auto-populate if near threshold)
             fill_pct = data['fill_percent']
             near_threshold = abs(fill_pct - threshold) < (threshold * 0.2)  # Within 20% of threshold
-            ws.cell(row=row, column=7, value="YES" if near_threshold else "")
-            if near_threshold:
-                ws.cell(row=row, column=7).fill = PatternFill(start_color="FFEB9C", end_color="FFEB9C", fill_type="solid")
-            
-            # H - OCR Correct? (empty for user to fill)
-            ws.cell(row=row, column=8, value="")
+            review = styled_cell(ws, "YES", fill=REVIEW_FILL) if near_threshold else ""
             
-            # I - Actual Status (empty for user to fill)
-            ws.cell(row=row, column=9, value="")
-            
-            # J - Reviewer (empty for user to fill)
-            ws.cell(row=row, column=10, value="")
-            
-            # K - Notes (empty for user to fill)
-            ws.cell(row=row, column=11, value="")
+            # OCR Results (columns A-F), then manual grading columns (G-K);
+            # H-K are left empty for the reviewer to fill
+            ws.append([f"Page {page_num:04d}", checkbox_id, q_row, q_col, f"{fill_pct:.1f}%", status,
+                       review, "", "", "", ""])
             
             row += 1
     
@@ -401,61 +400,38 @@ def create_detailed_with_grading_sheet(wb, all_results, threshold):
     # Validation for "Manual Review?" column (G)
     dv_review = DataValidation(type="list", formula1='"YES,NO"', allow_blank=True)
     dv_review.add(f'G5:G{row-1}')
-    ws.add_data_validation(dv_review)
+    ws.data_validations.append(dv_review)
     
     # Validation for "OCR Correct?" column (H)
     dv_correct = DataValidation(type="list", formula1='"CORRECT,INCORRECT,UNCERTAIN"', allow_blank=True)
     dv_correct.add(f'H5:H{row-1}')
-    ws.add_data_validation(dv_correct)
+    ws.data_validations.append(dv_correct)
     
     # Validation for "Actual Status" column (I)
     dv_status = DataValidation(type="list", formula1='"Checked,Empty"', allow_blank=True)
     dv_status.add(f'I5:I{row-1}')
-    ws.add_data_validation(dv_status)
-    
-    # Adjust column widths
-    ws.column_dimensions['A'].width = 12
-    ws.column_dimensions['B'].width = 15
-    ws.column_dimensions['C'].width = 8
-    ws.column_dimensions['D'].width = 10
-    ws.column_dimensions['E'].width = 10
-    ws.column_dimensions['F'].width = 12
-    ws.column_dimensions['G'].width = 15
-    ws.column_dimensions['H'].width = 15
-    ws.column_dimensions['I'].width = 15
-    ws.column_dimensions['J'].width = 15
-    ws.column_dimensions['K'].width = 30
+    ws.data_validations.append(dv_status)
 
 
 def create_tally_sheet(wb, all_results):
     """Create tally sheet showing response distribution."""
     ws = wb.create_sheet("Response Tally")
+    set_column_widths(ws, [14] * 7)
     
     # Title
-    ws['A1'] = "Response Tally - Checkbox Selections by Question"
-    ws['A1'].font = Font(bold=True, size=14)
-    ws.merge_cells('A1:G1')
+    ws.append([styled_cell(ws, "Response Tally - Checkbox Selections by Question", font=TITLE_FONT)])
+    ws.merged_cells.add('A1:G1')
     
     # Instructions
-    ws['A2'] = "This sheet shows how many times each checkbox was selected across all pages"
-    ws['A2'].font = Font(italic=True)
-    ws.merge_cells('A2:G2')
+    ws.append([styled_cell(ws, "This sheet shows how many times each checkbox was selected across all pages",
+                           font=ITALIC_FONT)])
+    ws.merged_cells.add('A2:G2')
+    ws.append([])
     
     # Headers
-    ws['A4'] = "Question"
-    ws['B4'] = "Column 1"
-    ws['C4'] = "Column 2"
-    ws['D4'] = "Column 3"
-    ws['E4'] = "Column 4"
-    ws['F4'] = "Column 5"
-    ws['G4'] = "Total Responses"
-    
-    for col in range(1, 8):
-        cell = ws.cell(row=4, column=col)
-        cell.font = Font(bold=True)
-        cell.fill = PatternFill(start_color="366092", end_color="366092", fill_type="solid")
-        cell.font = Font(bold=True, color="FFFFFF")
-        cell.alignment = Alignment(horizontal='center')
+    headers = ["Question", "Column 1", "Column 2", "Column 3", "Column 4", "Column 5", "Total Responses"]
+    ws.append([styled_cell(ws, header, font=HEADER_FONT, fill=HEADER_FILL, alignment=CENTER)
+               for header in headers])
     
     # Tally responses
     tally = {}
@@ -467,75 +443,59 @@ def create_tally_sheet(wb, all_results):
                 tally[checkbox_id] += 1
     
     # Fill in tally data
+    column_totals = [0] * 6
     for row_num in range(1, 6):  # Q1 through Q5
-        row = 4 + row_num
-        ws.cell(row=row, column=1, value=f"Q{row_num}")
-        ws.cell(row=row, column=1).font = Font(bold=True)
+        counts = [tally.get(f"Q{row_num}_{col_num}", 0) for col_num in range(1, 6)]  # Columns 1-5 (1-based)
+        row_values = counts + [sum(counts)]
+        column_totals = [total + value for total, value in zip(column_totals, row_values)]
         
-        row_total = 0
-        for col_num in range(1, 6):  # Columns 1-5 (1-based)
-            checkbox_id = f"Q{row_num}_{col_num}"
-            count = tally.get(checkbox_id, 0)
-            ws.cell(row=row, column=1+col_num, value=count)
-            ws.cell(row=row, column=1+col_num).alignment = Alignment(horizontal='center')
-            row_total += count
-        
-        ws.cell(row=row, column=7, value=row_total)
-        ws.cell(row=row, column=7).font = Font(bold=True)
-        ws.cell(row=row, column=7).alignment = Alignment(horizontal='center')
+        ws.append([styled_cell(ws, f"Q{row_num}", font=BOLD_FONT)] +
+                  [styled_cell(ws, count, alignment=CENTER) for count in counts] +
+                  [styled_cell(ws, row_values[-1], font=BOLD_FONT, alignment=CENTER)])
     
     # Column totals
-    ws['A10'] = "Total"
-    ws['A10'].font = Font(bold=True)
-    for col in range(2, 8):
-        total = sum(ws.cell(row=r, column=col).value or 0 for r in range(5, 10))
-        ws.cell(row=10, column=col, value=total)
-        ws.cell(row=10, column=col).font = Font(bold=True)
-        ws.cell(row=10, column=col).fill = PatternFill(start_color="D9E1F2", end_color="D9E1F2", fill_type="solid")
-        ws.cell(row=10, column=col).alignment = Alignment(horizontal='center')
-    
-    # Adjust column widths
-    for col in range(1, 8):
-        ws.column_dimensions[get_column_letter(col)].width = 14
+    ws.append([styled_cell(ws, "Total", font=BOLD_FONT)] +
+              [styled_cell(ws, total, font=BOLD_FONT, fill=TOTAL_FILL, alignment=CENTER)
+               for total in column_totals])
 
 
-def create_raw_data_sheet(wb, all_results):
+RAW_HEADERS = ['Page', 'Checkbox_ID', 'Question', 'Column', 'Fill_Percent', 'Is_Checked']
+
+# Above this many raw rows a plain CSV copy is written next to the workbook
+RAW_CSV_MIN_ROWS = 100_000
+
+
+def raw_data_rows(all_results):
+    """Flatten results into (page, id, question, column, fill, checked) tuples."""
+    rows = []
+    for page_num in sorted(all_results):
+        results = all_results[page_num]
+        for checkbox_id in sorted(results.keys()):
+            data = results[checkbox_id]
+            q_row, q_col = parse_checkbox_id(checkbox_id)
+            rows.append((page_num, checkbox_id, q_row, q_col, data['fill_percent'],
+                         1 if data['checked'] else 0))
+    return rows
+
+
+def create_raw_data_sheet(wb, rows):
     """Create raw data sheet for pivot tables and analysis."""
     ws = wb.create_sheet("Raw Data")
+    set_column_widths(ws, [14] * 6)
     
     # Headers
-    headers = ['Page', 'Checkbox_ID', 'Question', 'Column', 'Fill_Percent', 'Is_Checked']
-    for col, header in enumerate(headers, start=1):
-        cell = ws.cell(row=1, column=col)
-        cell.value = header
-        cell.font = Font(bold=True)
-        cell.fill = PatternFill(start_color="366092", end_color="366092", fill_type="solid")
-        cell.font = Font(bold=True, color="FFFFFF")
-    
-    row = 2
-    for page_num in sorted(all_results.keys()):
-        results = all_results[page_num]
-        
-        for checkbox_id in sorted(results.keys()):
-            data = results[checkbox_id]
-            
-            # Parse row and column (already 1-based)
-            parts = checkbox_id.split('_')
-            q_row = int(parts[0][1:])
-            q_col = int(parts[1])
-            
-            ws.cell(row=row, column=1, value=int(page_num))
-            ws.cell(row=row, column=2, value=checkbox_id)
-            ws.cell(row=row, column=3, value=q_row)
-            ws.cell(row=row, column=4, value=q_col)
-            ws.cell(row=row, column=5, value=data['fill_percent'])
-            ws.cell(row=row, column=6, value=1 if data['checked'] else 0)
-            
-            row += 1
+    ws.append([styled_cell(ws, header, font=HEADER_FONT, fill=HEADER_FILL) for header in RAW_HEADERS])
     
-    # Adjust column widths
-    for col in range(1, 7):
-        ws.column_dimensions[get_column_letter(col)].width = 14
+    for row in rows:
+        ws.append(row)
+
+
+def write_raw_data_csv(csv_path, rows):
+    """Write the raw data rows as CSV (much faster than XML for large runs)."""
+    with open(csv_path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(RAW_HEADERS)
+        writer.writerows(rows)
 
 
 def main():
@@ -558,6 +518,8 @@ Examples:
     parser.add_argument('--out', dest='output', help='Output Excel file path')
     parser.add_argument('--threshold', type=float, help='Detection threshold percentage (default: 11.5)')
     parser.add_argument('--near', type=float, default=0.03, help='± margin for near-threshold flagging (default: 0.03)')
+    parser.add_argument('--scale', type=float, default=1.0,
+                        help='Downsample pages before detection, e.g. 0.25 (default: 1.0, full resolution)')
     
     args = parser.parse_args()
     
@@ -574,7 +536,7 @@ Examples:
     print("="*70)
     print()
     
-    output_file = create_excel_report(run_folder, threshold, args.output)
+    output_file = create_excel_report(run_folder, threshold, args.output, args.scale)
     
     if output_file:
         print()
@@ -5,61 +5,82 @@ Master script to create all visualizations for a run in organized folders
 import cv2
 import numpy as np
 import json
+import os
 import sys
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache, partial
 from pathlib import Path
 from datetime import datetime
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))  # repo root, so scripts.common imports without PYTHONPATH
+from scripts.common import rois_as_array
 
 def analyze_checkbox(img_gray, x, y, w, h):
     """Extract and analyze a single checkbox"""
     checkbox = img_gray[y:y+h, x:x+w]
     _, binary = cv2.threshold(checkbox, 0, 255, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)
-    fill_pct = (np.sum(binary == 255) / binary.size) * 100
+    fill_pct = cv2.countNonZero(binary) * 100.0 / binary.size
     return fill_pct
 
-def get_color_for_threshold(fill_pct):
-    """Return color based on fill percentage thresholds"""
-    if fill_pct >= 55:
-        return (0, 0, 255), "CHECKED"  # Red
-    elif fill_pct >= 40:
-        return (0, 165, 255), "HIGH"  # Orange
-    elif fill_pct >= 30:
-        return (0, 255, 255), "MEDIUM"  # Yellow
-    elif fill_pct >= 20:
-        return (0, 255, 0), "LOW"  # Green
-    else:
-        return (128, 128, 128), "EMPTY"  # Gray
+# Fill-percentage cutoffs; np.digitize maps a fill to a band index 0..4
+FILL_EDGES = [20, 30, 40, 55]
+BAND_COLORS = [(128, 128, 128), (0, 255, 0), (0, 255, 255), (0, 165, 255), (0, 0, 255)]  # Gray, Green, Yellow, Orange, Red
+BAND_LABELS = ["EMPTY", "LOW", "MEDIUM", "HIGH", "CHECKED"]
+BAND_KEYS = ['empty', 'low_20', 'medium_30', 'high_40', 'checked_55']
 
-def create_basic_overlay(img_path, template, output_path):
-    """Create basic overlay with green boxes"""
-    img = cv2.imread(str(img_path))
-    if img is None:
-        return False
-    
+def analyze_page(img_gray, roi_ids, rois_norm):
+    """Measure every in-page ROI once; returns (roi_ids, rois_px, fills, bands)"""
+    h, w = img_gray.shape[:2]
+    
+    # Pixel boxes for every ROI in one multiply; only those inside the page are analyzed
+    rois_px = (rois_norm * (w, h, w, h)).astype(np.int32)
+    xs, ys, ws, hs = rois_px.T
+    inside = (xs >= 0) & (ys >= 0) & (xs + ws <= w) & (ys + hs <= h)
+    roi_ids = [r for r, ok in zip(roi_ids, inside) if ok]
+    
+    rois_px = rois_px[inside]
+    fills = np.array([analyze_checkbox(img_gray, *roi) for roi in rois_px.tolist()])
+    
+    # Classify every ROI into its fill band at once
+    bands = np.digitize(fills, FILL_EDGES)
+    return roi_ids, rois_px, fills, bands
+
+@lru_cache(maxsize=None)
+def fill_label_size(text):
+    """(width, height) of a fill-percent label; only ~100 distinct strings occur"""
+    return cv2.getTextSize(text, cv2.FONT_HERSHEY_SIMPLEX, 0.4, 1)[0]
+
+_canvas = None  # per-process scratch buffer for the threshold overlay + legend
+
+def _scratch_canvas(h, w):
+    """Reusable (h, w, 3) uint8 output buffer; reallocated only when the page size changes"""
+    global _canvas
+    if _canvas is None or _canvas.shape != (h, w, 3):
+        _canvas = np.empty((h, w, 3), dtype=np.uint8)
+    return _canvas
+
+def create_basic_overlay(img, roi_ids, rois_norm, output_path):
+    """Create basic overlay with green boxes on an already decoded page"""
     h, w = img.shape[:2]
     overlay = img.copy()
+    rois_px = (rois_norm * (w, h, w, h)).astype(np.int32)
     
-    for roi in template['checkbox_rois_norm']:
-        x = int(roi['x'] * w)
-        y = int(roi['y'] * h)
-        roi_w = int(roi['w'] * w)
-        roi_h = int(roi['h'] * h)
-        
+    for roi_id, (x, y, roi_w, roi_h) in zip(roi_ids, rois_px.tolist()):
         cv2.rectangle(overlay, (x, y), (x+roi_w, y+roi_h), (0, 255, 0), 2)
-        cv2.putText(overlay, roi['id'], (x, y-5),
+        cv2.putText(overlay, roi_id, (x, y-5),
                    cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 0), 2)
     
     cv2.imwrite(str(output_path), overlay)
     return True
 
-def create_threshold_overlay(img_path, template, output_path):
+def create_threshold_overlay(img, img_gray, roi_ids, rois_norm, output_path):
     """Create threshold overlay with color-coded fill levels"""
-    img = cv2.imread(str(img_path))
-    if img is None:
-        return False, None
-    
     h, w = img.shape[:2]
-    overlay = img.copy()
-    img_gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+    legend_height = 180
+    
+    # Page overlay and legend are views into one reused output canvas
+    canvas = _scratch_canvas(h + legend_height, w)
+    overlay = canvas[:h]
+    np.copyto(overlay, img)
     
     stats = {
         'checked_55': 0,
@@ -70,53 +91,37 @@ def create_threshold_overlay(img_path, template, output_path):
         'fills': []
     }
     
-    for roi in template['checkbox_rois_norm']:
-        x = int(roi['x'] * w)
-        y = int(roi['y'] * h)
-        roi_w = int(roi['w'] * w)
-        roi_h = int(roi['h'] * h)
-        
-        if x < 0 or y < 0 or x+roi_w > w or y+roi_h > h:
-            continue
-        
-        fill_pct = analyze_checkbox(img_gray, x, y, roi_w, roi_h)
-        stats['fills'].append(fill_pct)
-        
-        color, label = get_color_for_threshold(fill_pct)
-        
-        # Update stats
-        if fill_pct >= 55:
-            stats['checked_55'] += 1
-        elif fill_pct >= 40:
-            stats['high_40'] += 1
-        elif fill_pct >= 30:
-            stats['medium_30'] += 1
-        elif fill_pct >= 20:
-            stats['low_20'] += 1
-        else:
-            stats['empty'] += 1
-        
-        # Draw rectangle
-        cv2.rectangle(overlay, (x, y), (x+roi_w, y+roi_h), color, 3)
-        
+    roi_ids, rois_px, fills, bands = analyze_page(img_gray, roi_ids, rois_norm)
+    stats.update(zip(BAND_KEYS, np.bincount(bands, minlength=len(BAND_KEYS)).tolist()))
+    stats['fills'] = fills.tolist()
+    
+    # Box outlines: one polylines call per band colour (cv2.rectangle is a closed 4-point polyline)
+    x0, y0, x1, y1 = rois_px[:, 0], rois_px[:, 1], rois_px[:, 0] + rois_px[:, 2], rois_px[:, 1] + rois_px[:, 3]
+    corners = np.array([[x0, y0], [x1, y0], [x1, y1], [x0, y1]], dtype=np.int32).transpose(2, 0, 1)
+    for band in np.unique(bands).tolist():
+        cv2.polylines(overlay, list(corners[bands == band]), True, BAND_COLORS[band], 3)
+    
+    # Labels; the drawing calls and font parameters are bound as locals for the loop
+    put_text, rectangle = cv2.putText, cv2.rectangle
+    font = cv2.FONT_HERSHEY_SIMPLEX
+    for roi_id, (x, y, roi_w, roi_h), fill_pct, band in zip(roi_ids, rois_px.tolist(),
+                                                           stats['fills'], bands.tolist()):
         # Add fill percentage
         text = f"{fill_pct:.0f}%"
-        text_size = cv2.getTextSize(text, cv2.FONT_HERSHEY_SIMPLEX, 0.4, 1)[0]
+        text_size = fill_label_size(text)
         text_x = x + (roi_w - text_size[0]) // 2
         text_y = y + (roi_h + text_size[1]) // 2
         
-        cv2.rectangle(overlay, (text_x-2, text_y-text_size[1]-2), 
-                     (text_x+text_size[0]+2, text_y+2), (255, 255, 255), -1)
-        cv2.putText(overlay, text, (text_x, text_y),
-                   cv2.FONT_HERSHEY_SIMPLEX, 0.4, (0, 0, 0), 1)
+        rectangle(overlay, (text_x-2, text_y-text_size[1]-2), 
+                  (text_x+text_size[0]+2, text_y+2), (255, 255, 255), -1)
+        put_text(overlay, text, (text_x, text_y), font, 0.4, (0, 0, 0), 1)
         
         # Add checkbox ID
-        cv2.putText(overlay, roi['id'], (x, y-5),
-                   cv2.FONT_HERSHEY_SIMPLEX, 0.4, color, 1)
+        put_text(overlay, roi_id, (x, y-5), font, 0.4, BAND_COLORS[band], 1)
     
     # Create legend
-    legend_height = 180
-    legend = np.ones((legend_height, w, 3), dtype=np.uint8) * 255
+    legend = canvas[h:]
+    legend.fill(255)
     
     y_pos = 30
     legend_items = [
@@ -142,11 +147,30 @@ def create_threshold_overlay(img_path, template, output_path):
         cv2.putText(legend, f"Average: {avg_fill:.1f}%  |  Max: {max_fill:.1f}%", 
                    (20, y_pos+10), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 0, 255), 2)
     
-    result = np.vstack([overlay, legend])
-    cv2.imwrite(str(output_path), result)
+    cv2.imwrite(str(output_path), canvas)
     
     return True, stats
 
+def _process_page(img_path, roi_ids, rois_norm, basic_dir, threshold_dir):
+    """ProcessPoolExecutor task: write both overlays for one page"""
+    page_num = img_path.stem.split('_')[1]
+    
+    # Decode the page once; both overlays share the same BGR and grayscale arrays
+    img = cv2.imread(str(img_path))
+    if img is None:
+        return page_num, False, False, None
+    img_gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+    
+    # Create basic overlay
+    basic_output = basic_dir / f"page_{page_num}_basic.png"
+    basic_success = create_basic_overlay(img, roi_ids, rois_norm, basic_output)
+    
+    # Create threshold overlay
+    threshold_output = threshold_dir / f"page_{page_num}_threshold.png"
+    threshold_success, stats = create_threshold_overlay(img, img_gray, roi_ids, rois_norm, threshold_output)
+    
+    return page_num, basic_success, threshold_success, stats
+
 def main():
     if len(sys.argv) < 2:
         print("Usage: python generate_all_overlays.py <run_directory>")
@@ -167,6 +191,9 @@ def main():
     with open(template_path) as f:
         template = json.load(f)
     
+    # Normalized ROI geometry as one (N, 4) array; each page converts it in one multiply
+    roi_ids, rois_norm = rois_as_array(template)
+    
     # Find aligned cropped images
     aligned_dir = run_dir / "02_step2_alignment_and_crop/aligned_cropped"
     if not aligned_dir.exists():
@@ -207,17 +234,12 @@ def main():
         'empty': 0
     }
     
-    for img_path in image_files:
-        page_num = img_path.stem.split('_')[1]
-        
-        # Create basic overlay
-        basic_output = basic_dir / f"page_{page_num}_basic.png"
-        basic_success = create_basic_overlay(img_path, template, basic_output)
-        
-        # Create threshold overlay
-        threshold_output = threshold_dir / f"page_{page_num}_threshold.png"
-        threshold_success, stats = create_threshold_overlay(img_path, template, threshold_output)
-        
+    # Pages are independent, so render them across all cores
+    worker = partial(_process_page, roi_ids=roi_ids, rois_norm=rois_norm, basic_dir=basic_dir, threshold_dir=threshold_dir)
+    with ProcessPoolExecutor(max_workers=os.cpu_count()) as ex:
+        page_results = list(ex.map(worker, image_files, chunksize=4))
+    
+    for page_num, basic_success, threshold_success, stats in page_results:
         status = "✅" if (basic_success and threshold_success) else "❌"
         
         if threshold_success and stats:
@@ -246,22 +268,27 @@ def main():
     
     # Save summary to file
     summary_path = overlays_dir / "SUMMARY.txt"
-    with open(summary_path, 'w') as f:
-        f.write(f"Overlay Generation Summary\n")
-        f.write(f"{'='*70}\n\n")
-        f.write(f"Generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
-        f.write(f"Run: {run_dir.name}\n")
-        f.write(f"Pages processed: {len(image_files)}\n")
-        f.write(f"Total checkboxes: {total_boxes}\n\n")
-        f.write(f"Detection Results:\n")
-        f.write(f"  CHECKED (≥55%):   {total_stats['checked_55']:3d} ({total_stats['checked_55']/total_boxes*100:5.1f}%)\n")
-        f.write(f"  HIGH (40-54%):    {total_stats['high_40']:3d} ({total_stats['high_40']/total_boxes*100:5.1f}%)\n")
-        f.write(f"  MEDIUM (30-39%):  {total_stats['medium_30']:3d} ({total_stats['medium_30']/total_boxes*100:5.1f}%)\n")
-        f.write(f"  LOW (20-29%):     {total_stats['low_20']:3d} ({total_stats['low_20']/total_boxes*100:5.1f}%)\n")
-        f.write(f"  EMPTY (<20%):     {total_stats['empty']:3d} ({total_stats['empty']/total_boxes*100:5.1f}%)\n\n")
-        f.write(f"Output Directories:\n")
-        f.write(f"  Basic overlays: overlays/basic/\n")
-        f.write(f"  Threshold overlays: overlays/threshold/\n")
+    summary_lines = [
+        "Overlay Generation Summary",
+        "="*70,
+        "",
+        f"Generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}",
+        f"Run: {run_dir.name}",
+        f"Pages processed: {len(image_files)}",
+        f"Total checkboxes: {total_boxes}",
+        "",
+        "Detection Results:",
+        f"  CHECKED (≥55%):   {total_stats['checked_55']:3d} ({total_stats['checked_55']/total_boxes*100:5.1f}%)",
+        f"  HIGH (40-54%):    {total_stats['high_40']:3d} ({total_stats['high_40']/total_boxes*100:5.1f}%)",
+        f"  MEDIUM (30-39%):  {total_stats['medium_30']:3d} ({total_stats['medium_30']/total_boxes*100:5.1f}%)",
+        f"  LOW (20-29%):     {total_stats['low_20']:3d} ({total_stats['low_20']/total_boxes*100:5.1f}%)",
+        f"  EMPTY (<20%):     {total_stats['empty']:3d} ({total_stats['empty']/total_boxes*100:5.1f}%)",
+        "",
+        "Output Directories:",
+        "  Basic overlays: overlays/basic/",
+        "  Threshold overlays: overlays/threshold/",
+    ]
+    summary_path.write_text("\n".join(summary_lines) + "\n")
     
     print(f"\n✅ Summary saved to: {summary_path}")
     
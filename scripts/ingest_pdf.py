@@ -1,14 +1,25 @@
 #!/usr/bin/env python3
-import argparse, time, pathlib, json
+import argparse, time, pathlib, json, os, tempfile
 from pdf2image import convert_from_path
 
 def main():
     ap = argparse.ArgumentParser()
     ap.add_argument("--pdf", required=True)
-    ap.add_argument("--dpi", type=int, default=300)
+    ap.add_argument("--dpi", type=int, default=None,
+                    help="Rasterization DPI (default: the template's page_size.dpi, else 300)")
+    ap.add_argument("--template", default=None, help="Template JSON whose page_size.dpi sets the default --dpi")
     ap.add_argument("--threshold", type=float, default=None, help="Fill threshold to include in run name")
     args = ap.parse_args()
 
+    # Render no finer than the template was designed at; alignment warps every
+    # page to the template's pixel size anyway
+    if args.dpi is None:
+        dpi = 300
+        if args.template:
+            tpl = json.loads(pathlib.Path(args.template).read_text())
+            dpi = int(tpl.get("page_size", {}).get("dpi", dpi))
+        args.dpi = dpi
+
     timestamp = time.strftime('%Y%m%d_%H%M%S')
     if args.threshold is not None:
         # Format threshold to avoid floating point precision issues
@@ -20,12 +31,17 @@ def main():
     (run_dir/"step0_images").mkdir(parents=True, exist_ok=True)
     (run_dir/"logs").mkdir(parents=True, exist_ok=True)
 
-    pages = convert_from_path(args.pdf, dpi=args.dpi)
-    for i, img in enumerate(pages, 1):
-        img.save(run_dir/"step0_images"/f"page_{i:04d}.png")
+    # Let pdftoppm write the PNGs itself (no PIL round trip), one process per
+    # core over contiguous page ranges, then give them the page_NNNN names;
+    # paths come back in page order
+    with tempfile.TemporaryDirectory(dir=run_dir) as tmp:
+        pages = convert_from_path(args.pdf, dpi=args.dpi, output_folder=tmp, fmt="png", paths_only=True,
+                                  thread_count=os.cpu_count() or 1)
+        for i, path in enumerate(pages, 1):
+            os.replace(path, run_dir/"step0_images"/f"page_{i:04d}.png")
     with open(run_dir/"logs"/"steps.jsonl","a") as f:
-        f.write(json.dumps({"step":"ingest","pages":len(pages),"run_dir":str(run_dir)})+"\n")
-    print(f"Ingested {len(pages)} pages -> {run_dir}")
+        f.write(json.dumps({"step":"ingest","pages":len(pages),"dpi":args.dpi,"run_dir":str(run_dir)})+"\n")
+    print(f"Ingested {len(pages)} pages at {args.dpi} DPI -> {run_dir}")
 
 if __name__=="__main__":
     main()
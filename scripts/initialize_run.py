@@ -6,185 +6,26 @@ This script sets up a new processing run with all required documentation,
 snapshots, and structure following best practices.
 """
 
+import importlib.util
 import json
+import os
+import runpy
 import shutil
-import subprocess
+import string
 import sys
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from pathlib import Path
-from typing import Optional
+from typing import List, Optional, Tuple
 
-
-def create_run_structure(run_dir: Path) -> None:
-    """Create complete directory structure for a run."""
-    directories = [
-        "input",
-        "scripts_archive",
-        "step1_anchors",
-        "step2_cropped",
-        "step3_text",
-        "diagnostics/grid_overlays",
-        "notes",
-        "env",
-        "configs_snapshot",
-        "metrics/histograms",
-        "diffs"
-    ]
-    
-    for dir_path in directories:
-        (run_dir / dir_path).mkdir(parents=True, exist_ok=True)
-    
-    print(f"✅ Created directory structure in {run_dir.name}")
-
-
-def capture_environment(run_dir: Path) -> None:
-    """Capture environment using dedicated script."""
-    script = Path(__file__).parent / "capture_environment.py"
-    
-    if script.exists():
-        print("Capturing environment...")
-        subprocess.run([sys.executable, str(script), str(run_dir)], check=True)
-    else:
-        print("⚠️  capture_environment.py not found, skipping")
-
-
-def snapshot_configs(run_dir: Path, template: str = "crc_survey_l_anchors_v1") -> dict:
-    """Snapshot configurations using dedicated script."""
-    script = Path(__file__).parent / "snapshot_configs.py"
-    
-    if script.exists():
-        print("Snapshotting configurations...")
-        result = subprocess.run(
-            [sys.executable, str(script), str(run_dir), "--template", template],
-            check=True,
-            capture_output=True,
-            text=True
-        )
-        print(result.stdout)
-        
-        # Load checksums
-        metadata_file = run_dir / "configs_snapshot" / "metadata.json"
-        if metadata_file.exists():
-            return json.loads(metadata_file.read_text())
-    else:
-        print("⚠️  snapshot_configs.py not found, skipping")
-        return {}
-
-
-def archive_scripts(run_dir: Path) -> None:
-    """Archive current scripts to run directory."""
-    scripts_archive = run_dir / "scripts_archive"
-    project_root = Path(__file__).parent.parent
-    scripts_dir = project_root / "scripts"
-    
-    scripts_to_archive = [
-        "step1_find_anchors.py",
-        "step2_align_and_crop.py",
-        "step3_extract_text.py",
-        "run_ocr.py",
-        "check_alignment.py",
-        "make_overlays.py",
-        "qa_overlay_from_results.py",
-        "validate_run.py",
-        "common.py",
-        "expand_grid.py"
-    ]
-    
-    archived_count = 0
-    for script_name in scripts_to_archive:
-        src = scripts_dir / script_name
-        if src.exists():
-            shutil.copy2(src, scripts_archive / script_name)
-            archived_count += 1
-    
-    print(f"✅ Archived {archived_count} scripts")
-
-
-def create_manifest(
-    run_dir: Path,
-    template: str,
-    config_checksums: dict,
-    input_file: Optional[Path] = None
-) -> None:
-    """Create MANIFEST.json for the run."""
-    
-    run_id = run_dir.name
-    
-    manifest = {
-        "run_id": run_id,
-        "timestamp": datetime.now().strftime("%Y-%m-%dT%H:%M:%SZ"),
-        "timezone": "America/New_York",
-        "operator": "user",  # Update with actual user
-        "git_commit": None,  # Will be filled during commit
-        "git_branch": None,
-        "template": {
-            "name": template,
-            "version": "1.0"
-        },
-        "input": {
-            "file": input_file.name if input_file else "survey.pdf",
-            "pages": None,  # Will be filled during processing
-            "md5": None
-        },
-        "parameters": {
-            "step1": {
-                "dpi": 300,
-                "anchor_detection_threshold": 0.7
-            },
-            "step2": {
-                "crop_margin_inches": 0.125,
-                "expected_width_px": 2267,
-                "expected_height_px": 2813
-            },
-            "step3": {
-                "tesseract_psm": 6,
-                "language": "eng"
-            }
-        },
-        "snapshots": config_checksums.get("files", {}),
-        "execution": {
-            "step1": {"status": "pending"},
-            "step2": {"status": "pending"},
-            "step3": {"status": "pending"}
-        },
-        "gates": {
-            "alignment": {
-                "ok_threshold_px": 2.0,
-                "warn_threshold_px": 5.0,
-                "pass": None
-            },
-            "checkbox": {
-                "enabled": False,
-                "threshold": 0.55,
-                "pass": None
-            },
-            "ocr": {
-                "min_text_length": 100,
-                "pass": None
-            }
-        },
-        "issues": [],
-        "notes": ""
-    }
-    
-    manifest_file = run_dir / "MANIFEST.json"
-    manifest_file.write_text(json.dumps(manifest, indent=2))
-    print(f"✅ Created MANIFEST.json")
-
-
-def create_readme(run_dir: Path, template: str) -> None:
-    """Create README.md from template."""
-    
-    run_id = run_dir.name
-    date_str = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    
-    readme_content = f"""# Run {run_id}
+# Document bodies, rendered with string.Template; only names, dates and paths vary per run
+_README_TMPL = string.Template("""# Run $run_id
 
 ## Run Information
 
-**Date**: {date_str}
+**Date**: $date
 **Operator**: [Your Name]
-**Template**: {template}
+**Template**: $template
 **Git Commit**: [to be filled]
 **Branch**: [to be filled]
 
@@ -243,22 +84,11 @@ def create_readme(run_dir: Path, template: str) -> None:
 ---
 
 **Prepared by**: [Your Name]
-**Date**: {date_str}
-**Last Updated**: {date_str}
-"""
-    
-    readme_file = run_dir / "README.md"
-    readme_file.write_text(readme_content)
-    print(f"✅ Created README.md")
+**Date**: $date
+**Last Updated**: $date
+""")
 
-
-def create_notes_templates(run_dir: Path) -> None:
-    """Create template files in notes/ directory."""
-    
-    notes_dir = run_dir / "notes"
-    
-    # ISSUES.md
-    issues_content = f"""# Issues Log - {run_dir.name}
+_ISSUES_TMPL = string.Template("""# Issues Log - $run_name
 
 *Document problems encountered during processing*
 
@@ -276,11 +106,9 @@ def create_notes_templates(run_dir: Path) -> None:
 [How it was fixed]
 
 ---
-"""
-    (notes_dir / "ISSUES.md").write_text(issues_content)
-    
-    # CHANGES.md
-    changes_content = f"""# Changes Log - {run_dir.name}
+""")
+
+_CHANGES_TMPL = string.Template("""# Changes Log - $run_name
 
 *Document modifications from standard process*
 
@@ -297,11 +125,9 @@ def create_notes_templates(run_dir: Path) -> None:
 [What was changed]
 
 ---
-"""
-    (notes_dir / "CHANGES.md").write_text(changes_content)
-    
-    # VALIDATION.md
-    validation_content = f"""# Validation Report - {run_dir.name}
+""")
+
+_VALIDATION_TMPL = string.Template("""# Validation Report - $run_name
 
 ## Validation Date
 *To be completed*
@@ -319,11 +145,9 @@ def create_notes_templates(run_dir: Path) -> None:
 *To be completed after Step 3*
 
 ---
-"""
-    (notes_dir / "VALIDATION.md").write_text(validation_content)
-    
-    # DATA_PROVENANCE.md
-    provenance_content = f"""# Data Provenance - {run_dir.name}
+""")
+
+_PROVENANCE_TMPL = string.Template("""# Data Provenance - $run_name
 
 ## Source Information
 
@@ -345,15 +169,13 @@ def create_notes_templates(run_dir: Path) -> None:
 **Preprocessing**: [Any preprocessing done]
 
 ---
-"""
-    (notes_dir / "DATA_PROVENANCE.md").write_text(provenance_content)
-    
-    # RETENTION.md
-    retention_content = f"""# Retention Policy - {run_dir.name}
+""")
+
+_RETENTION_TMPL = string.Template("""# Retention Policy - $run_name
 
 ## Backup Information
 
-**Primary Location**: `{run_dir}`
+**Primary Location**: `${run_dir}`
 **Backup Location**: [S3 / Azure / GCP path]
 **Backup Date**: [When backed up]
 
@@ -374,10 +196,213 @@ def create_notes_templates(run_dir: Path) -> None:
 **Access log location**: [Where access is logged]
 
 ---
-"""
-    (notes_dir / "RETENTION.md").write_text(retention_content)
+""")
+
+
+def create_run_structure(run_dir: Path) -> None:
+    """Create complete directory structure for a run."""
+    directories = [
+        "input",
+        "scripts_archive",
+        "step1_anchors",
+        "step2_cropped",
+        "step3_text",
+        "diagnostics",
+        "diagnostics/grid_overlays",
+        "notes",
+        "env",
+        "configs_snapshot",
+        "metrics",
+        "metrics/histograms",
+        "diffs"
+    ]
     
-    print("✅ Created note templates")
+    # Parents are listed before their children, so after the run directory
+    # itself each entry is one plain mkdir (no per-level parent checks)
+    run_dir.mkdir(parents=True, exist_ok=True)
+    for dir_path in directories:
+        try:
+            os.mkdir(run_dir / dir_path)
+        except FileExistsError:
+            pass
+    
+    print(f"✅ Created directory structure in {run_dir.name}")
+
+
+def _load_sibling(name: str):
+    """Import a script from this directory as a module, with or without scripts/ on sys.path."""
+    spec = importlib.util.spec_from_file_location(name, Path(__file__).parent / f"{name}.py")
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def capture_environment(run_dir: Path) -> None:
+    """Capture environment using dedicated script (run in-process, not spawned)."""
+    script = Path(__file__).parent / "capture_environment.py"
+    
+    if script.exists():
+        print("Capturing environment...")
+        saved_argv = sys.argv
+        sys.argv = [str(script), str(run_dir)]
+        try:
+            runpy.run_path(str(script), run_name="__main__")
+        except SystemExit as e:
+            if e.code not in (None, 0):
+                raise RuntimeError(f"capture_environment.py exited with status {e.code}") from e
+        finally:
+            sys.argv = saved_argv
+    else:
+        print("⚠️  capture_environment.py not found, skipping")
+
+
+def snapshot_configs(run_dir: Path, template: str = "crc_survey_l_anchors_v1") -> dict:
+    """Snapshot configurations using dedicated script (imported, not spawned)."""
+    script = Path(__file__).parent / "snapshot_configs.py"
+    
+    if script.exists():
+        print("Snapshotting configurations...")
+        checksums = _load_sibling("snapshot_configs").snapshot_configs(run_dir, template)
+        print(f"\n✅ Snapshot complete ({len(checksums)} files)\n")
+        
+        # Load checksums
+        metadata_file = run_dir / "configs_snapshot" / "metadata.json"
+        if metadata_file.exists():
+            return json.loads(metadata_file.read_text())
+    else:
+        print("⚠️  snapshot_configs.py not found, skipping")
+        return {}
+
+
+def archive_scripts(run_dir: Path) -> None:
+    """Archive current scripts to run directory."""
+    scripts_archive = run_dir / "scripts_archive"
+    project_root = Path(__file__).parent.parent
+    scripts_dir = project_root / "scripts"
+    
+    scripts_to_archive = [
+        "step1_find_anchors.py",
+        "step2_align_and_crop.py",
+        "step3_extract_text.py",
+        "run_ocr.py",
+        "check_alignment.py",
+        "make_overlays.py",
+        "qa_overlay_from_results.py",
+        "validate_run.py",
+        "common.py",
+        "expand_grid.py"
+    ]
+    
+    # Real copies, not hardlinks: editing a script in place must not rewrite the
+    # archive. copy2 already goes through sendfile on Linux.
+    archived_count = 0
+    for script_name in scripts_to_archive:
+        src = scripts_dir / script_name
+        if src.exists():
+            shutil.copy2(src, scripts_archive / script_name)
+            archived_count += 1
+    
+    print(f"✅ Archived {archived_count} scripts")
+
+
+def create_manifest(
+    run_dir: Path,
+    template: str,
+    config_checksums: dict,
+    input_file: Optional[Path] = None
+) -> List[Tuple[Path, str]]:
+    """Render MANIFEST.json for the run as (path, content) pairs."""
+    
+    run_id = run_dir.name
+    
+    manifest = {
+        "run_id": run_id,
+        "timestamp": datetime.now().strftime("%Y-%m-%dT%H:%M:%SZ"),
+        "timezone": "America/New_York",
+        "operator": "user",  # Update with actual user
+        "git_commit": None,  # Will be filled during commit
+        "git_branch": None,
+        "template": {
+            "name": template,
+            "version": "1.0"
+        },
+        "input": {
+            "file": input_file.name if input_file else "survey.pdf",
+            "pages": None,  # Will be filled during processing
+            "md5": None
+        },
+        "parameters": {
+            "step1": {
+                "dpi": 300,
+                "anchor_detection_threshold": 0.7
+            },
+            "step2": {
+                "crop_margin_inches": 0.125,
+                "expected_width_px": 2267,
+                "expected_height_px": 2813
+            },
+            "step3": {
+                "tesseract_psm": 6,
+                "language": "eng"
+            }
+        },
+        "snapshots": config_checksums.get("files", {}),
+        "execution": {
+            "step1": {"status": "pending"},
+            "step2": {"status": "pending"},
+            "step3": {"status": "pending"}
+        },
+        "gates": {
+            "alignment": {
+                "ok_threshold_px": 2.0,
+                "warn_threshold_px": 5.0,
+                "pass": None
+            },
+            "checkbox": {
+                "enabled": False,
+                "threshold": 0.55,
+                "pass": None
+            },
+            "ocr": {
+                "min_text_length": 100,
+                "pass": None
+            }
+        },
+        "issues": [],
+        "notes": ""
+    }
+    
+    return [(run_dir / "MANIFEST.json", json.dumps(manifest, indent=2))]
+
+
+def create_readme(run_dir: Path, template: str) -> List[Tuple[Path, str]]:
+    """Render README.md from template as (path, content) pairs."""
+    
+    run_id = run_dir.name
+    date_str = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    
+    return [(run_dir / "README.md", _README_TMPL.substitute(run_id=run_id, template=template, date=date_str))]
+
+
+def create_notes_templates(run_dir: Path) -> List[Tuple[Path, str]]:
+    """Render the notes/ template files as (path, content) pairs."""
+    
+    notes_dir = run_dir / "notes"
+    run_name = run_dir.name
+    
+    return [
+        (notes_dir / "ISSUES.md", _ISSUES_TMPL.substitute(run_name=run_name)),
+        (notes_dir / "CHANGES.md", _CHANGES_TMPL.substitute(run_name=run_name)),
+        (notes_dir / "VALIDATION.md", _VALIDATION_TMPL.substitute(run_name=run_name)),
+        (notes_dir / "DATA_PROVENANCE.md", _PROVENANCE_TMPL.substitute(run_name=run_name)),
+        (notes_dir / "RETENTION.md", _RETENTION_TMPL.substitute(run_name=run_name, run_dir=run_dir)),
+    ]
+
+
+def write_files(files: List[Tuple[Path, str]]) -> None:
+    """Write (path, content) pairs concurrently; per-file open/close dominates on slow filesystems."""
+    with ThreadPoolExecutor(max_workers=4) as ex:
+        list(ex.map(lambda item: item[0].write_text(item[1]), files))
 
 
 def initialize_run(
@@ -432,14 +457,15 @@ def initialize_run(
     # Snapshot configs
     config_checksums = snapshot_configs(run_dir, template)
     
-    # Create manifest
-    create_manifest(run_dir, template, config_checksums, input_file)
-    
-    # Create README
-    create_readme(run_dir, template)
-    
-    # Create note templates
-    create_notes_templates(run_dir)
+    # Render the manifest, README and note templates first, then write them in one batch
+    write_files(
+        create_manifest(run_dir, template, config_checksums, input_file)
+        + create_readme(run_dir, template)
+        + create_notes_templates(run_dir)
+    )
+    print(f"✅ Created MANIFEST.json")
+    print(f"✅ Created README.md")
+    print("✅ Created note templates")
     
     print(f"\n{'='*60}")
     print(f"✅ RUN INITIALIZED SUCCESSFULLY")
@@ -1,6 +1,6 @@
 #!/usr/bin/env python3
 import argparse, numpy as np, cv2, json
-from scripts.common import read_json, latest_run_dir, sorted_pages, tpl_size, roi_to_poly, apply_h
+from scripts.common import read_json, read_results, latest_run_dir, sorted_pages, tpl_size, roi_to_poly, apply_h
 
 def main():
     ap = argparse.ArgumentParser()
@@ -16,7 +16,7 @@ def main():
     step5_dir = latest/"step5_qa_overlays"
     step5_dir.mkdir(exist_ok=True)
 
-    results = read_json(latest/"step4_ocr_results"/"results.json")
+    results = read_results(latest/"step4_ocr_results")
     hmap = read_json(logs_dir/"homography.json")
     state = {r["page"]: {b["id"]: b for b in r["checkboxes"]} for r in results}
     rois = tpl.get("checkbox_rois_norm", [])
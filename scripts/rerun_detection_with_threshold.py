@@ -12,7 +12,7 @@ def detect_checkbox(img_gray, x, y, w, h):
     """Detect checkbox using Otsu thresholding"""
     checkbox = img_gray[y:y+h, x:x+w]
     _, binary = cv2.threshold(checkbox, 0, 255, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)
-    fill_pct = (np.sum(binary == 255) / binary.size) * 100
+    fill_pct = cv2.countNonZero(binary) * 100.0 / binary.size
     return fill_pct
 
 def main():
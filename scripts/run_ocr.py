@@ -2,12 +2,23 @@
 from __future__ import annotations
 import argparse
 import json
+import multiprocessing as mp
+import os
 import pathlib
+import queue
+import subprocess
+import sys
+import tempfile
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 import numpy as np
 import cv2
-import yaml
 import joblib
-from scripts.common import read_json, write_json_atomic, latest_run_dir, sorted_pages, tpl_size
+try:
+    import tesserocr  # optional: keeps one Tesseract engine in-process for --text
+except ImportError:
+    tesserocr = None
+from scripts.common import imread_gray, load_template, load_yaml, write_json_atomic, write_results_parquet, latest_run_dir, sorted_pages, tpl_size
 
 def roi_crop(img, roi, tpl_w, tpl_h, min_margin):
     x = int(roi["x"]*tpl_w) + min_margin
@@ -18,8 +29,47 @@ def roi_crop(img, roi, tpl_w, tpl_h, min_margin):
     return img[y:y+h, x:x+w]
 
 def mean_fill(gray_roi):
-    norm = gray_roi.astype(np.float32)/255.0
-    return float((1.0 - norm).mean())
+    # Integer sum, no float32 copy of the crop; same formula as mean_fills
+    return 1.0 - int(gray_roi.sum(dtype=np.int64)) / (255.0 * gray_roi.size)
+
+def roi_boxes(rois_np, img_w, img_h, min_margin):
+    """(N, 4) int x, y, w, h crop boxes for normalized ROIs, inset by min_margin like roi_crop"""
+    px = (rois_np * (img_w, img_h, img_w, img_h)).astype(np.int64)
+    px[:, :2] += min_margin
+    px[:, 2:] -= 2*min_margin
+    px[:, :2] = np.maximum(px[:, :2], 0)
+    px[:, 2:] = np.maximum(px[:, 2:], 1)
+    return px
+
+def mean_fills(gray, boxes):
+    """mean_fill of every box at once: one summed-area table, four lookups per ROI"""
+    img_h, img_w = gray.shape
+    S = cv2.integral(gray, sdepth=cv2.CV_64F)
+    # Clip to the page like a slice does
+    x0 = np.minimum(boxes[:, 0], img_w); x1 = np.minimum(boxes[:, 0] + boxes[:, 2], img_w)
+    y0 = np.minimum(boxes[:, 1], img_h); y1 = np.minimum(boxes[:, 1] + boxes[:, 3], img_h)
+    sums = S[y1, x1] - S[y0, x1] - S[y1, x0] + S[y0, x0]
+    return 1.0 - sums / (255.0 * (x1 - x0) * (y1 - y0))
+
+def page_text_lengths(image_paths, langs):
+    """Tesseract text length per page from one engine: tesserocr in-process, else one CLI run over a file list"""
+    if not image_paths:
+        return []
+    if tesserocr is not None:
+        with tesserocr.PyTessBaseAPI(lang=langs) as api:
+            lengths = []
+            for p in image_paths:
+                api.SetImageFile(str(p))
+                lengths.append(len(api.GetUTF8Text()))
+            return lengths
+    with tempfile.TemporaryDirectory() as tmp:
+        list_path = pathlib.Path(tmp)/"pages.txt"
+        list_path.write_text("".join(f"{p}\n" for p in image_paths), encoding="utf-8")
+        out = subprocess.run(["tesseract", str(list_path), "stdout", "-l", langs],
+                             capture_output=True, text=True, check=True).stdout
+    # Tesseract ends every page's text with a form feed
+    texts = out.split("\f")
+    return [len(texts[i]) if i < len(texts) else 0 for i in range(len(image_paths))]
 
 def extract_checkbox_features(gray_crop):
     """
@@ -113,14 +163,100 @@ def enhance_checkbox_with_color(img_bgr, x, y, w, h, use_color_fusion=True):
     
     return fused
 
+BOX_DTYPE = np.dtype([("score", np.float64), ("checked", np.bool_)])  # one record per ROI
+
+_page_ctx = {}  # run-wide settings for _process_page, filled in by main before the pool starts
+
+def _page_geometry(img_w, img_h):
+    """ROI boxes (array and list) for one page size, computed once per size and reused"""
+    c = _page_ctx
+    key = (img_w, img_h)
+    if key not in c["geometry"]:
+        roi_px = roi_boxes(c["rois_np"], img_w, img_h, c["min_margin"])
+        c["geometry"][key] = roi_px, roi_px.tolist()
+    return c["geometry"][key]
+
+def _read_ahead(jobs):
+    """Yield (img_path, text_len, img) with the next page decoding on a thread while the caller scores this one"""
+    # Without colour fusion only luminance is used, so skip the 3-channel decode of gray pages
+    read = (lambda p: cv2.imread(str(p))) if _page_ctx["use_color_fusion"] else imread_gray
+    q = queue.Queue(maxsize=2)
+
+    def producer():
+        for img_path, text_len in jobs:
+            q.put((img_path, text_len, read(img_path)))  # imread/cvtColor release the GIL
+        q.put(None)
+
+    threading.Thread(target=producer, daemon=True).start()
+    while (item := q.get()) is not None:
+        yield item
+
+def _process_pages(jobs):
+    """Score a chunk of (img_path, text_len) jobs in one worker, prefetching each next page"""
+    return [_process_page(img_path, text_len, img) for img_path, text_len, img in _read_ahead(jobs)]
+
+def _process_page(img_path, text_len, img):
+    """Score every checkbox on one decoded aligned page
+
+    Returns (page name, text_len, BOX_DTYPE array in ROI order), which is far
+    cheaper to pickle back from a worker than a list of per-ROI dicts.
+    """
+    c = _page_ctx
+    model, scaler = c["model"], c["scaler"]
+    use_color_fusion = c["use_color_fusion"]
+    
+    # Use cropped image dimensions directly (no homography warp)
+    img_h, img_w = img.shape[:2]
+
+    # Aligned crops share one size, so this is normally computed on the first page only
+    roi_px, roi_px_list = _page_geometry(img_w, img_h)
+    
+    boxes = np.empty(len(roi_px_list), dtype=BOX_DTYPE)
+    if c["vectorized"]:
+        boxes["score"] = mean_fills(img, roi_px)
+        boxes["checked"] = boxes["score"] >= c["roi_thresholds"]
+        return img_path.name, text_len, boxes
+
+    for i, (threshold, (x, y, w, h)) in enumerate(zip(c["roi_threshold_list"], roi_px_list)):
+        # Apply color channel fusion enhancement
+        if use_color_fusion:
+            crop = enhance_checkbox_with_color(img, x, y, w, h)
+        else:
+            crop = img[y:y+h, x:x+w]
+        
+        # Use ML model if available, otherwise fall back to threshold
+        if model is not None and scaler is not None:
+            # Extract features and predict
+            features = extract_checkbox_features(crop)
+            feature_vector = np.array([[features[name] for name in c["feature_names"]]])
+            feature_scaled = scaler.transform(feature_vector)
+            probability = model.predict_proba(feature_scaled)[0, 1]
+            
+            # Use configurable ML decision threshold (probability is the score)
+            boxes[i] = probability, probability >= c["ml_threshold"]
+        else:
+            # Fallback to threshold-only detection (question-specific threshold if available)
+            score = mean_fill(crop)
+            boxes[i] = score, score >= threshold
+    return img_path.name, text_len, boxes
+
+def page_record(page, text_len, roi_ids, boxes):
+    """The results.json dict for one page; per-ROI dicts are only built here, at serialization"""
+    checkboxes = [{"id": rid, "score": score, "checked": checked}
+                  for rid, score, checked in zip(roi_ids, boxes["score"].tolist(), boxes["checked"].tolist())]
+    return {"page": page, "text_len": text_len, "checkboxes": checkboxes,
+            "checkbox_checked_total": int(boxes["checked"].sum())}
+
 def main():
     ap = argparse.ArgumentParser()
     ap.add_argument("--template", required=True)
     ap.add_argument("--threshold", type=float, default=None,
                    help="Checkbox fill threshold (0-100%%). Overrides config/template. Default: from config or template.")
+    ap.add_argument("--text", action="store_true",
+                   help="Also run Tesseract text extraction (one batched process for all pages). Default: off.")
     args = ap.parse_args()
 
-    tpl = read_json(args.template)
+    tpl = load_template(args.template)
     rois = tpl.get("checkbox_rois_norm", [])
     tpl_w, tpl_h = tpl_size(tpl)
 
@@ -132,7 +268,7 @@ def main():
     step4_dir = latest/"step4_ocr_results"
     step4_dir.mkdir(exist_ok=True)
 
-    cfg = yaml.safe_load(open("configs/ocr.yaml")) or {}
+    cfg = load_yaml("configs/ocr.yaml") or {}
     langs = "+".join((cfg.get("tesseract_langs") or ["eng"]))
     
     # Threshold priority: CLI arg > template > config > default
@@ -190,61 +326,48 @@ def main():
     feature_names = ['fill_pct', 'edge_density', 'stroke_length', 'corner_count', 
                      'num_components', 'hv_ratio', 'variance']
 
-    out_pages = []
-    for img_path in sorted_pages(images_dir):
-        img = cv2.imread(str(img_path))
-        
-        # Use cropped image dimensions directly (no homography warp)
-        img_h, img_w = img.shape[:2]
-
-        # Skip slow Tesseract text extraction for faster testing
-        # text = pytesseract.image_to_string(gray, lang=langs)
-        # text_len = len(text or "")
-        text_len = 0
-
-        boxes = []
-        filled = 0
-        for r in rois:
-            # Extract checkbox directly from cropped image using normalized coordinates
-            x = int(r["x"] * img_w) + min_margin
-            y = int(r["y"] * img_h) + min_margin
-            w = int(r["w"] * img_w) - 2*min_margin
-            h = int(r["h"] * img_h) - 2*min_margin
-            x = max(0, x)
-            y = max(0, y)
-            w = max(1, w)
-            h = max(1, h)
-            
-            # Apply color channel fusion enhancement
-            crop = enhance_checkbox_with_color(img, x, y, w, h, use_color_fusion)
-            
-            # Use ML model if available, otherwise fall back to threshold
-            if model is not None and scaler is not None:
-                # Extract features and predict
-                features = extract_checkbox_features(crop)
-                feature_vector = np.array([[features[name] for name in feature_names]])
-                feature_scaled = scaler.transform(feature_vector)
-                probability = model.predict_proba(feature_scaled)[0, 1]
-                
-                # Use configurable ML decision threshold
-                checked = bool(probability >= ml_threshold)
-                score = float(probability)  # Use probability as score
-            else:
-                # Fallback to threshold-only detection
-                # Get question-specific threshold if available
-                question_prefix = r["id"].split("_")[0]  # e.g., "Q1" from "Q1_1"
-                threshold = per_q_thresholds.get(question_prefix, fill_th)
-                
-                score = mean_fill(crop)
-                checked = bool(score >= threshold)
-            
-            filled += int(checked)
-            boxes.append({"id": r["id"], "score": score, "checked": checked})
-        out_pages.append({"page": img_path.name, "text_len": text_len, "checkboxes": boxes, "checkbox_checked_total": filled})
+    # ROI geometry and thresholds as arrays; only the pixel scale depends on the page
+    roi_ids = [r["id"] for r in rois]
+    rois_np = np.array([(r["x"], r["y"], r["w"], r["h"]) for r in rois], dtype=np.float64).reshape(-1, 4)
+    roi_thresholds = np.array([per_q_thresholds.get(rid.split("_")[0], fill_th) for rid in roi_ids])
+    # Threshold-only scoring on plain grayscale needs no per-ROI crops
+    vectorized = model is None and not use_color_fusion
+
+    pages = sorted_pages(images_dir)
+    # Slow Tesseract text extraction is opt-in; text_len stays 0 without --text
+    text_lens = page_text_lengths(pages, langs) if args.text else [0]*len(pages)
+
+    # Pages are independent; forked workers inherit the model and ROI arrays without pickling
+    _page_ctx.update(roi_ids=roi_ids, rois_np=rois_np, roi_thresholds=roi_thresholds,
+                     roi_threshold_list=roi_thresholds.tolist(), geometry={},
+                     min_margin=min_margin, use_color_fusion=use_color_fusion, vectorized=vectorized,
+                     model=model, scaler=scaler, ml_threshold=ml_threshold, feature_names=feature_names)
+    jobs = list(zip(pages, text_lens))
+    chunks = [jobs[i:i+4] for i in range(0, len(jobs), 4)]
+    workers = max(1, (os.cpu_count() or 2) - 1)
+    if sys.platform != "darwin" and "fork" in mp.get_all_start_methods():
+        with ProcessPoolExecutor(max_workers=workers, mp_context=mp.get_context("fork")) as ex:
+            page_boxes = [r for rs in ex.map(_process_pages, chunks) for r in rs]
+    else:
+        # No safe fork here; OpenCV releases the GIL, so threads still overlap the work
+        with ThreadPoolExecutor(max_workers=workers) as ex:
+            page_boxes = [r for rs in ex.map(_process_pages, chunks) for r in rs]
+    out_pages = [page_record(page, text_len, roi_ids, boxes) for page, text_len, boxes in page_boxes]
 
-    write_json_atomic(step4_dir/"results.json", out_pages)
-    # Also save to logs for backwards compatibility
-    write_json_atomic(logs_dir/"ocr_results.json", out_pages)
+    results_path = step4_dir/"results.json"
+    write_json_atomic(results_path, out_pages)
+    # Columnar copy for downstream loaders (skipped when pyarrow is not installed)
+    write_results_parquet(step4_dir/"results.parquet", out_pages)
+    # Also save to logs for backwards compatibility; the bytes are identical, so
+    # hardlink them (swapped in atomically) instead of serializing twice
+    legacy_path = logs_dir/"ocr_results.json"
+    link_tmp = legacy_path.with_name(legacy_path.name + ".tmp")
+    try:
+        link_tmp.unlink(missing_ok=True)
+        os.link(results_path, link_tmp)
+        os.replace(link_tmp, legacy_path)
+    except OSError:
+        write_json_atomic(legacy_path, out_pages)
     with open(logs_dir/"steps.jsonl","a") as f:
         f.write(json.dumps({"step":"ocr","run_dir":str(latest),"pages":len(out_pages)})+"\n")
 
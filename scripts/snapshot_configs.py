@@ -8,19 +8,24 @@ pipeline into the run directory and generates checksums for verification.
 
 import hashlib
 import json
+import mmap
+import os
 import shutil
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from pathlib import Path
 from typing import Dict, Any
 
 
 def compute_sha256(file_path: Path) -> str:
-    """Compute SHA256 checksum of a file."""
-    sha256_hash = hashlib.sha256()
+    """Compute SHA256 checksum of a file (hashed in C, no Python read loop)."""
     with open(file_path, "rb") as f:
-        for byte_block in iter(lambda: f.read(4096), b""):
-            sha256_hash.update(byte_block)
-    return sha256_hash.hexdigest()
+        if hasattr(hashlib, "file_digest"):  # Python 3.11+
+            return hashlib.file_digest(f, "sha256").hexdigest()
+        if os.fstat(f.fileno()).st_size == 0:  # mmap cannot map an empty file
+            return hashlib.sha256().hexdigest()
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            return hashlib.sha256(mm).hexdigest()
 
 
 def snapshot_configs(run_dir: Path, template_name: str = "crc_survey_l_anchors_v1") -> Dict[str, Any]:
@@ -38,10 +43,13 @@ def snapshot_configs(run_dir: Path, template_name: str = "crc_survey_l_anchors_v
     snapshot_dir.mkdir(parents=True, exist_ok=True)
     
     project_root = Path(__file__).parent.parent
-    checksums = {}
+    copied = {}  # checksum label -> snapshot path, hashed together after copying
     
     print(f"Snapshotting configs to: {snapshot_dir}")
     
+    # Snapshots are real copies (not hardlinks) so later edits to the originals
+    # cannot change them
+    
     # Template files
     template_dir = project_root / "templates" / template_name
     if template_dir.exists():
@@ -50,7 +58,7 @@ def snapshot_configs(run_dir: Path, template_name: str = "crc_survey_l_anchors_v
             if src.exists():
                 dst = snapshot_dir / f"template_{file_name}"
                 shutil.copy2(src, dst)
-                checksums[f"template_{file_name}"] = compute_sha256(dst)
+                copied[f"template_{file_name}"] = dst
                 print(f"  ✅ Copied {file_name}")
     
     # Config files
@@ -61,9 +69,13 @@ def snapshot_configs(run_dir: Path, template_name: str = "crc_survey_l_anchors_v
             if src.exists():
                 dst = snapshot_dir / config_file
                 shutil.copy2(src, dst)
-                checksums[config_file] = compute_sha256(dst)
+                copied[config_file] = dst
                 print(f"  ✅ Copied {config_file}")
     
+    # OpenSSL hashing releases the GIL, so threads hash the files concurrently
+    with ThreadPoolExecutor() as ex:
+        checksums = dict(zip(copied, ex.map(compute_sha256, copied.values())))
+    
     # Write checksums file
     checksums_file = snapshot_dir / "checksums.txt"
     with open(checksums_file, "w") as f:
@@ -88,6 +100,12 @@ def snapshot_configs(run_dir: Path, template_name: str = "crc_survey_l_anchors_v
     return checksums
 
 
+def load_checksums(checksums_file: Path) -> Dict[str, str]:
+    """Parse checksums.txt ("<sha256>  <filename>" lines) into {filename: checksum}, in file order."""
+    lines = checksums_file.read_bytes().decode("utf-8").splitlines()
+    return {name: checksum for checksum, name in (line.split(None, 1) for line in lines)}
+
+
 def compare_configs(run_a: Path, run_b: Path) -> Dict[str, Any]:
     """
     Compare config snapshots between two runs.
@@ -110,14 +128,10 @@ def compare_configs(run_a: Path, run_b: Path) -> Dict[str, Any]:
     checksums_b = {}
     
     if (snapshot_a / "checksums.txt").exists():
-        for line in (snapshot_a / "checksums.txt").read_text().splitlines():
-            checksum, filename = line.split(None, 1)
-            checksums_a[filename] = checksum
+        checksums_a = load_checksums(snapshot_a / "checksums.txt")
     
     if (snapshot_b / "checksums.txt").exists():
-        for line in (snapshot_b / "checksums.txt").read_text().splitlines():
-            checksum, filename = line.split(None, 1)
-            checksums_b[filename] = checksum
+        checksums_b = load_checksums(snapshot_b / "checksums.txt")
     
     # Compare
     all_files = set(checksums_a.keys()) | set(checksums_b.keys())
@@ -165,17 +179,21 @@ def verify_checksums(run_dir: Path) -> bool:
     
     print(f"Verifying checksums in {snapshot_dir}...")
     
+    expected = load_checksums(checksums_file)
+    present = [snapshot_dir / filename for filename in expected if (snapshot_dir / filename).exists()]
+    with ThreadPoolExecutor() as ex:
+        actual = dict(zip(present, ex.map(compute_sha256, present)))
+    
     all_valid = True
-    for line in checksums_file.read_text().splitlines():
-        expected_checksum, filename = line.split(None, 1)
+    for filename, expected_checksum in expected.items():
         file_path = snapshot_dir / filename
         
-        if not file_path.exists():
+        if file_path not in actual:
             print(f"  ❌ {filename}: File missing")
             all_valid = False
             continue
         
-        actual_checksum = compute_sha256(file_path)
+        actual_checksum = actual[file_path]
         if actual_checksum == expected_checksum:
             print(f"  ✅ {filename}: Valid")
         else:
@@ -1,15 +1,32 @@
 #!/usr/bin/env python3
 """
 STEP 1: Find L-shaped anchor marks on each page
-- Detects corner anchors using contour analysis
+- Detects corner anchors using connected-component analysis
 - Saves detailed detection logs
 - Creates visualization showing detected anchors
 """
-import argparse, json, pathlib, time
+import argparse, json, os, pathlib, time
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+# One OpenCV/OpenMP thread per process: pages already run one per core, and
+# findContours/threshold only contend on locks when threaded further
+os.environ.setdefault("OMP_NUM_THREADS", "1")
 import numpy as np
 import cv2
+cv2.setNumThreads(1)
+cv2.ocl.setUseOpenCL(False)
 from PIL import Image, ImageDraw, ImageFont
 
+CORNER_NAMES = ("Top-Left", "Top-Right", "Bottom-Right", "Bottom-Left")
+CORNER_ABBREVS = ("TL", "TR", "BR", "BL")
+
+# Visualization encoders: previews are for human review, so lossy JPEG (fast, small) is the default
+VIS_FORMATS = {
+    "png": [],
+    "jpg": [cv2.IMWRITE_JPEG_QUALITY, 85],
+    "webp": [cv2.IMWRITE_WEBP_QUALITY, 80],
+}
+
 def find_l_marks(gray_img, approx_xy, search_window=80):
     """
     Find L-shaped anchor marks near expected position.
@@ -32,39 +49,33 @@ def find_l_marks(gray_img, approx_xy, search_window=80):
     blur = cv2.GaussianBlur(roi, (5, 5), 0)
     _, binary = cv2.threshold(blur, 0, 255, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)
     
-    # Find contours
-    contours, _ = cv2.findContours(binary, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    # Label connected blobs; area and centroid come back in one call. 16-bit labels
+    # are much cheaper and always suffice for the default ±80px window (at most one
+    # 8-connected blob per 2×2 cell)
+    rh, rw = binary.shape
+    ltype = cv2.CV_16U if ((rh + 1) // 2) * ((rw + 1) // 2) < 65536 else cv2.CV_32S
+    num, _, stats, centroids = cv2.connectedComponentsWithStats(binary, connectivity=8, ltype=ltype)
     
-    if not contours:
+    if num < 2:  # Background only
         return None
     
-    # Find largest contour (likely the L-mark)
-    largest = max(contours, key=cv2.contourArea)
-    area = cv2.contourArea(largest)
+    # Find largest component (likely the L-mark), skipping background label 0
+    idx = 1 + int(np.argmax(stats[1:, cv2.CC_STAT_AREA]))
+    area = stats[idx, cv2.CC_STAT_AREA]
     
     if area < 10:  # Too small
         return None
     
-    # Calculate centroid
-    M = cv2.moments(largest)
-    if M["m00"] == 0:
-        cx, cy = largest.reshape(-1, 2).mean(axis=0)
-    else:
-        cx = M["m10"] / M["m00"]
-        cy = M["m01"] / M["m00"]
+    cx, cy = centroids[idx]
     
     # Convert back to full image coordinates
     abs_x = x0 + cx
     abs_y = y0 + cy
     
     # Calculate confidence based on area and shape
-    perimeter = cv2.arcLength(largest, True)
-    if perimeter == 0:
-        confidence = 0.0
-    else:
-        # L-shapes have high perimeter-to-area ratio
-        compactness = 4 * np.pi * area / (perimeter * perimeter)
-        confidence = min(1.0, area / 500) * (1.0 - compactness)  # L-marks are not compact
+    # L-shapes fill little of their bounding box (low extent)
+    extent = area / (stats[idx, cv2.CC_STAT_WIDTH] * stats[idx, cv2.CC_STAT_HEIGHT])
+    confidence = min(1.0, area / 500) * (1.0 - extent)  # L-marks are not compact
     
     return {
         'x': float(abs_x),
@@ -74,11 +85,109 @@ def find_l_marks(gray_img, approx_xy, search_window=80):
         'found': True
     }
 
+def process_page(img_path, norm_xy, search_window, visualizations_dir, vis_format="jpg"):
+    """
+    Detect the anchors on one page and write its visualization.
+    Returns: (page name, page record, log lines) so the parent prints in page order
+    """
+    lines = []
+    log = lines.append
+    log(f"📄 {img_path.name}")
+
+    # Load image
+    img = cv2.imread(str(img_path))
+    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+    h, w = gray.shape[:2]
+
+    log(f"   Image size: {w}×{h} pixels")
+
+    # Calculate expected anchor positions in pixels
+    expected_positions = (norm_xy * np.array([w, h], dtype=np.float64)).tolist()
+
+    # Detect anchors
+    detected = []
+    for i, (exp_x, exp_y) in enumerate(expected_positions):
+        corner_name = CORNER_NAMES[i]
+        log(f"   Anchor {i+1} ({corner_name}):")
+        log(f"      Expected: ({exp_x:.1f}, {exp_y:.1f})")
+
+        result = find_l_marks(gray, (exp_x, exp_y), search_window)
+
+        if result:
+            log(f"      ✓ Detected: ({result['x']:.1f}, {result['y']:.1f})")
+            log(f"      Confidence: {result['confidence']:.2%}")
+            log(f"      Area: {result['area']:.0f} px²")
+            detected.append(result)
+        else:
+            log(f"      ✗ NOT FOUND")
+            detected.append({
+                'x': exp_x,
+                'y': exp_y,
+                'found': False,
+                'confidence': 0.0
+            })
+
+    # Calculate detection rate
+    found_count = sum(1 for d in detected if d.get('found', False))
+    detection_rate = found_count / len(norm_xy)
+
+    log(f"   Detection: {found_count}/{len(norm_xy)} anchors ({detection_rate:.0%})")
+
+    # Create visualization
+    vis_img = img.copy()
+    for i, (anchor_data, (exp_x, exp_y)) in enumerate(zip(detected, expected_positions)):
+        corner_name = CORNER_ABBREVS[i]
+
+        if anchor_data.get('found', False):
+            # Draw detected anchor (green)
+            det_x, det_y = int(anchor_data['x']), int(anchor_data['y'])
+            cv2.circle(vis_img, (det_x, det_y), 15, (0, 255, 0), 3)
+            cv2.putText(vis_img, f"{corner_name}", (det_x+20, det_y), 
+                       cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 255, 0), 2)
+
+            # Draw search area (light green)
+            cv2.rectangle(vis_img, 
+                        (int(exp_x - search_window), int(exp_y - search_window)),
+                        (int(exp_x + search_window), int(exp_y + search_window)),
+                        (0, 255, 0), 1)
+        else:
+            # Draw expected position (red)
+            exp_xi, exp_yi = int(exp_x), int(exp_y)
+            cv2.circle(vis_img, (exp_xi, exp_yi), 15, (0, 0, 255), 3)
+            cv2.putText(vis_img, f"{corner_name} ?", (exp_xi+20, exp_yi), 
+                       cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 0, 255), 2)
+
+            # Draw search area (red)
+            cv2.rectangle(vis_img, 
+                        (int(exp_x - search_window), int(exp_y - search_window)),
+                        (int(exp_x + search_window), int(exp_y + search_window)),
+                        (0, 0, 255), 1)
+
+    # Add legend
+    cv2.putText(vis_img, f"Anchors: {found_count}/{len(norm_xy)}", 
+               (20, 40), cv2.FONT_HERSHEY_SIMPLEX, 1, (255, 255, 255), 2)
+    cv2.putText(vis_img, "Green = Detected | Red = Not Found", 
+               (20, 80), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 255), 2)
+
+    # Save visualization
+    vis_path = visualizations_dir / f"{img_path.stem}_anchors.{vis_format}"
+    cv2.imwrite(str(vis_path), vis_img, VIS_FORMATS[vis_format])
+
+    log("")
+    return img_path.name, {
+        'image_size': {'width': w, 'height': h},
+        'detected_anchors': detected,
+        'detection_rate': detection_rate,
+        'found_count': found_count
+    }, lines
+
 def main():
     ap = argparse.ArgumentParser(description="Step 1: Find anchor marks")
     ap.add_argument("--run-dir", required=True, help="Run directory with images/")
     ap.add_argument("--template", required=True, help="Template JSON with anchor positions")
     ap.add_argument("--search-window", type=int, default=80, help="Search window size in pixels")
+    ap.add_argument("--vis-format", choices=sorted(VIS_FORMATS), default="jpg",
+                    help="Image format for anchor visualizations (default: jpg)")
     args = ap.parse_args()
     
     run_dir = pathlib.Path(args.run_dir)
@@ -95,6 +204,8 @@ def main():
         template = json.load(f)
     
     anchors_norm = template['anchors_norm']
+    # Normalised anchor positions, scaled to pixels once per page below
+    norm_xy = np.array([[a['x'], a['y']] for a in anchors_norm], dtype=np.float64)
     
     print("=" * 80)
     print("STEP 1: ANCHOR DETECTION")
@@ -121,99 +232,13 @@ def main():
         'pages': {}
     }
     
-    for img_path in pages:
-        print(f"📄 {img_path.name}")
-        
-        # Load image
-        img = cv2.imread(str(img_path))
-        gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-        h, w = gray.shape[:2]
-        
-        print(f"   Image size: {w}×{h} pixels")
-        
-        # Calculate expected anchor positions in pixels
-        expected_positions = [
-            (w * a['x'], h * a['y']) for a in anchors_norm
-        ]
-        
-        # Detect anchors
-        detected = []
-        for i, (exp_x, exp_y) in enumerate(expected_positions):
-            corner_name = ["Top-Left", "Top-Right", "Bottom-Right", "Bottom-Left"][i]
-            print(f"   Anchor {i+1} ({corner_name}):")
-            print(f"      Expected: ({exp_x:.1f}, {exp_y:.1f})")
-            
-            result = find_l_marks(gray, (exp_x, exp_y), args.search_window)
-            
-            if result:
-                print(f"      ✓ Detected: ({result['x']:.1f}, {result['y']:.1f})")
-                print(f"      Confidence: {result['confidence']:.2%}")
-                print(f"      Area: {result['area']:.0f} px²")
-                detected.append(result)
-            else:
-                print(f"      ✗ NOT FOUND")
-                detected.append({
-                    'x': exp_x,
-                    'y': exp_y,
-                    'found': False,
-                    'confidence': 0.0
-                })
-        
-        # Calculate detection rate
-        found_count = sum(1 for d in detected if d.get('found', False))
-        detection_rate = found_count / len(anchors_norm)
-        
-        print(f"   Detection: {found_count}/{len(anchors_norm)} anchors ({detection_rate:.0%})")
-        
-        # Create visualization
-        vis_img = img.copy()
-        for i, (anchor_data, (exp_x, exp_y)) in enumerate(zip(detected, expected_positions)):
-            corner_name = ["TL", "TR", "BR", "BL"][i]
-            
-            if anchor_data.get('found', False):
-                # Draw detected anchor (green)
-                det_x, det_y = int(anchor_data['x']), int(anchor_data['y'])
-                cv2.circle(vis_img, (det_x, det_y), 15, (0, 255, 0), 3)
-                cv2.putText(vis_img, f"{corner_name}", (det_x+20, det_y), 
-                           cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 255, 0), 2)
-                
-                # Draw search area (light green)
-                cv2.rectangle(vis_img, 
-                            (int(exp_x - args.search_window), int(exp_y - args.search_window)),
-                            (int(exp_x + args.search_window), int(exp_y + args.search_window)),
-                            (0, 255, 0), 1)
-            else:
-                # Draw expected position (red)
-                exp_xi, exp_yi = int(exp_x), int(exp_y)
-                cv2.circle(vis_img, (exp_xi, exp_yi), 15, (0, 0, 255), 3)
-                cv2.putText(vis_img, f"{corner_name} ?", (exp_xi+20, exp_yi), 
-                           cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 0, 255), 2)
-                
-                # Draw search area (red)
-                cv2.rectangle(vis_img, 
-                            (int(exp_x - args.search_window), int(exp_y - args.search_window)),
-                            (int(exp_x + args.search_window), int(exp_y + args.search_window)),
-                            (0, 0, 255), 1)
-        
-        # Add legend
-        cv2.putText(vis_img, f"Anchors: {found_count}/{len(anchors_norm)}", 
-                   (20, 40), cv2.FONT_HERSHEY_SIMPLEX, 1, (255, 255, 255), 2)
-        cv2.putText(vis_img, "Green = Detected | Red = Not Found", 
-                   (20, 80), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 255), 2)
-        
-        # Save visualization
-        vis_path = visualizations_dir / f"{img_path.stem}_anchors.png"
-        cv2.imwrite(str(vis_path), vis_img)
-        
-        # Store results
-        results['pages'][img_path.name] = {
-            'image_size': {'width': w, 'height': h},
-            'detected_anchors': detected,
-            'detection_rate': detection_rate,
-            'found_count': found_count
-        }
-        
-        print()
+    # Pages are independent, so detect them across all cores
+    worker = partial(process_page, norm_xy=norm_xy, search_window=args.search_window,
+                     visualizations_dir=visualizations_dir, vis_format=args.vis_format)
+    with ProcessPoolExecutor(max_workers=os.cpu_count()) as ex:
+        for name, record, lines in ex.map(worker, pages):
+            print('\n'.join(lines))
+            results['pages'][name] = record
     
     # Save detailed JSON log
     log_path = step1_dir / "anchor_detection_log.json"